@@ -1,26 +1,391 @@
 # project/burner.py
 import os
+import re
+import sys
 import subprocess
 import shutil
-import shlex
+import functools
 from datetime import datetime
+from helpers import get_audio_codecs
+from subtitle import glow_pass_path
 
-def burn_subtitles_ffmpeg(video_path, ass_path, srt_path, output_dir, temp_dir, style):
+VAAPI_DEVICE = "/dev/dri/renderD128"
+# "downscaled" glow mode: the wide glow layers are blurred at 1/GLOW_PASS_SCALE size;
+# sigma 4 there is about libass' \blur16 at full size (the middle of the 20/16/12 layers it replaces)
+GLOW_PASS_SCALE = 4
+GLOW_PASS_SIGMA = 4
+
+# ffmpeg log lines meaning the encoder itself couldn't start (driver/GPU missing, session limit, ...)
+_ENCODER_INIT_ERRORS = (
+    "Error while opening encoder",
+    "Could not open encoder",
+    "Error initializing output stream",
+    "OpenEncodeSessionEx failed",
+    "No capable devices found",
+    "Cannot load libcuda",
+    "Cannot load nvcuda",
+    "Cannot load libnvidia-encode",
+    "Failed to initialise VAAPI",
+)
+# Audio codecs the .mp4 output can take as-is; anything else (Opus/Vorbis from mkv/webm, PCM, ...) is re-encoded
+_MP4_AUDIO_CODECS = frozenset({"aac", "mp3", "ac3", "eac3", "alac"})
+
+def _encoder_works(encoder):
+    """
+    Tiny lavfi test encode with `encoder`. Builds such as gyan.dev's list h264_nvenc even on
+    machines without an NVIDIA GPU, so being compiled in says nothing about being usable.
+    """
+    input_args, vf_args = [], []
+    if encoder == "h264_vaapi":
+        input_args = ["-vaapi_device", VAAPI_DEVICE]
+        vf_args = ["-vf", "format=nv12,hwupload"]
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", *input_args,
+        "-f", "lavfi", "-i", "color=s=256x256:d=0.1",
+        *vf_args, "-c:v", encoder, "-f", "null", "-"
+    ]
+    try:
+        subprocess.run(cmd, capture_output=True, stdin=subprocess.DEVNULL, check=True, timeout=20)
+    except Exception:
+        return False
+    return True
+
+@functools.lru_cache(maxsize=1)
+def hw_encoder():
+    """
+    Find a working hardware H.264 encoder once (result is cached): each one ffmpeg lists is
+    checked with a test encode. Priority: NVENC, VideoToolbox, VAAPI (only if the render node
+    exists). None means libx264.
+    """
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-encoders"],
+            capture_output=True, text=True, check=True
+        )
+    except Exception:
+        return None
+    encoders = {line.split()[1] for line in result.stdout.splitlines() if len(line.split()) > 1}
+    candidates = ["h264_nvenc", "h264_videotoolbox"]
+    if os.path.exists(VAAPI_DEVICE):
+        candidates.append("h264_vaapi")
+    for encoder in candidates:
+        if encoder in encoders and _encoder_works(encoder):
+            return encoder
+    return None
+
+def nvenc_available():
+    """
+    True when h264_nvenc passed hw_encoder()'s test encode (NVENC session limits apply).
+    Only being compiled in doesn't count, so batch mode isn't capped on machines without a GPU.
+    """
+    return hw_encoder() == "h264_nvenc"
+
+@functools.lru_cache(maxsize=1)
+def cuda_hwaccel_available():
+    """
+    Check once that the CUDA side of the GPU pipeline works: ffmpeg lists the cuda hwaccel and a
+    tiny hwupload_cuda -> h264_nvenc test encode succeeds. Like NVENC, "cuda" is listed by
+    builds that run on machines without an NVIDIA GPU.
+    """
+    if not nvenc_available():
+        return False
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-hwaccels"],
+            capture_output=True, text=True, check=True
+        )
+    except Exception:
+        return False
+    if "cuda" not in result.stdout.split():
+        return False
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-init_hw_device", "cuda=gpu", "-filter_hw_device", "gpu",
+        "-f", "lavfi", "-i", "color=s=256x256:d=0.1",
+        "-vf", "format=nv12,hwupload_cuda", "-c:v", "h264_nvenc", "-f", "null", "-"
+    ]
+    try:
+        subprocess.run(cmd, capture_output=True, stdin=subprocess.DEVNULL, check=True, timeout=20)
+    except Exception:
+        return False
+    return True
+
+@functools.lru_cache(maxsize=1)
+def subtitle_filters_available():
+    """
+    Probe ffmpeg once for its libass-based filters and the ones the downscaled glow pass needs.
+    Returns the subset of {'ass', 'subtitles', 'drawbox', 'gblur', 'blend'} that is compiled in,
+    or None if ffmpeg couldn't be queried (then every tier is tried).
+    """
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-filters"],
+            capture_output=True, text=True, check=True
+        )
+    except Exception:
+        return None
+    names = {line.split()[1] for line in result.stdout.splitlines() if len(line.split()) > 2}
+    return frozenset(names & {"ass", "subtitles", "drawbox", "gblur", "blend"})
+
+def _video_codec_args(crf, encoder):
+    """
+    Video encoder arguments for `encoder` (a hw_encoder() name, None = libx264), with the
+    quality knob mapped from the x264 CRF. NVENC's -cq is kept one step above it.
+    """
+    if encoder == "h264_nvenc":
+        return ["-c:v", "h264_nvenc", "-preset", "p4", "-tune", "hq", "-rc", "vbr", "-cq", str(crf + 1), "-b:v", "0"]
+    if encoder == "h264_videotoolbox":
+        return ["-c:v", "h264_videotoolbox", "-q:v", str(max(1, 100 - 2 * crf))]
+    if encoder == "h264_vaapi":
+        return ["-c:v", "h264_vaapi", "-qp", str(crf)]
+    return ["-c:v", "libx264", "-preset", "fast", "-crf", str(crf)]
+
+def _audio_codec_args(input_path):
+    """
+    Stream-copy the audio when the .mp4 output can hold every audio track, else re-encode to AAC.
+    (The mux maps all tracks and a burn may pick any of them, so all are checked.)
+    If ffprobe can't tell, only audio from an mp4/mov source is assumed to be copyable.
+    """
+    codecs = get_audio_codecs(input_path)
+    if codecs is None:
+        copyable = input_path.lower().endswith(('.mp4', '.mov', '.m4v'))
+    else:
+        copyable = all(codec in _MP4_AUDIO_CODECS for codec in codecs)
+    if copyable:
+        return ["-c:a", "copy"]
+    described = ", ".join(codecs) if codecs else "unknown codec"
+    print(f"[INFO] Audio ({described}) can't be copied into .mp4; re-encoding it to AAC.")
+    return ["-c:a", "aac", "-b:a", "192k"]
+
+def _burn_cmd(input_path, vf, output_path, crf, encoder, audio_args):
+    """ffmpeg command for one CPU-decode burn attempt. VAAPI needs its device and an upload after the overlay."""
+    input_args = []
+    if encoder == "h264_vaapi":
+        input_args = ["-vaapi_device", VAAPI_DEVICE]
+        vf = f"{vf},format=nv12,hwupload"
+    return [
+        "ffmpeg", "-hide_banner", "-loglevel", "info",
+        *input_args,
+        "-i", input_path,
+        "-vf", vf,
+        *_video_codec_args(crf, encoder),
+        *audio_args, "-y", output_path
+    ]
+
+def _glow_pass_prefix(glow_arg, fonts_arg):
+    """
+    Filtergraph prefix for the "downscaled" glow mode: the glow-pass ASS is rendered onto a black
+    copy of each frame, blurred at 1/GLOW_PASS_SCALE size, scaled back and screen-blended onto the
+    video (in RGB, where black adds nothing). The main subtitle filter is appended after it.
+    The blurred glow is overlaid on the full-size black copy, so blend always gets the size of the
+    decoded (autorotated) frame and a width/height not divisible by the scale just leaves a black edge.
+    """
+    fontsdir = f":fontsdir={fonts_arg}" if fonts_arg else ""
+    return (
+        "split[capvid][capglow];"
+        "[capglow]drawbox=c=black:t=fill,split[capbg][capglowsrc];"
+        f"[capglowsrc]ass={glow_arg}{fontsdir},scale=iw/{GLOW_PASS_SCALE}:ih/{GLOW_PASS_SCALE},"
+        f"gblur=sigma={GLOW_PASS_SIGMA},scale=iw*{GLOW_PASS_SCALE}:ih*{GLOW_PASS_SCALE}[capglows];"
+        "[capbg][capglows]overlay,format=gbrp[capglowb];"
+        "[capvid]format=gbrp[capvidb];"
+        "[capvidb][capglowb]blend=all_mode=screen,format=yuv420p,"
+    )
+
+def _escape_filter_path(path):
     """
-    Burns captions into the video. Prioritizes using SRT+fontsdir (preserves ms precision
-    and forces libass to use the copied font file). Falls back to ASS (system lookup)
-    then to SRT without fontsdir.
+    Escape an absolute path for use as a subtitles=/ass=/fontsdir= value inside -vf.
+    ffmpeg unescapes twice (filter option value, then filtergraph), so escape for both.
+    On Windows backslashes become forward slashes first, so only the drive colon needs escaping.
     """
+    path = os.path.abspath(path)
+    if os.sep == '\\':
+        path = path.replace('\\', '/')
+    for ch in ('\\', "'", ':'):
+        path = path.replace(ch, '\\' + ch)
+    for ch in ('\\', "'", '[', ']', ',', ';'):
+        path = path.replace(ch, '\\' + ch)
+    return path
+
+def _reserve_output_path(output_dir):
+    """
+    Pick captioned_<timestamp>.mp4 in output_dir and create it exclusively, so parallel
+    batch workers finishing in the same second never write to the same file.
+    """
+    os.makedirs(output_dir, exist_ok=True)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_path = os.path.join(output_dir, f"captioned_{timestamp}.mp4")
+    n = 0
+    while True:
+        suffix = f"_{n}" if n else ""
+        output_path = os.path.abspath(os.path.join(output_dir, f"captioned_{timestamp}{suffix}.mp4"))
+        try:
+            os.close(os.open(output_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return output_path
+        except FileExistsError:
+            n += 1
+
+def _log_path_for(output_path):
+    """ffmpeg log next to the output video (captioned_<timestamp>.log); kept only if the run fails."""
+    return os.path.splitext(output_path)[0] + ".log"
+
+def _run_ffmpeg(cmd, log_path):
+    """
+    Run ffmpeg with its output appended to log_path instead of the terminal, so the log chatter
+    of a long encode never round-trips through the console. Only the -stats progress line is
+    echoed (rewritten in place). The tail of the log is printed if ffmpeg fails.
+    """
+    with open(log_path, "ab") as log:
+        log.write(f"\n$ {' '.join(cmd)}\n".encode("utf-8", "replace"))
+        log.flush()
+        proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.PIPE)
+        pending = b""
+        shown = False
+        try:
+            while True:
+                chunk = proc.stderr.read1(65536)
+                if not chunk:
+                    break
+                log.write(chunk)
+                # progress lines end in \r, everything else in \n
+                *lines, pending = re.split(rb"[\r\n]", pending + chunk)
+                stats = [line for line in lines if line.startswith((b"frame=", b"size="))]
+                if stats:
+                    sys.stdout.write("\r    " + stats[-1].decode("utf-8", "replace").strip() + " ")
+                    sys.stdout.flush()
+                    shown = True
+        except BaseException:
+            proc.kill()  # e.g. Ctrl+C: don't leave ffmpeg encoding in the background
+            raise
+        finally:
+            proc.stderr.close()
+            returncode = proc.wait()
+        if shown:
+            sys.stdout.write("\n")
+        log.write(pending)
+        if returncode:
+            log.flush()
+            _print_log_tail(log_path)
+            raise subprocess.CalledProcessError(returncode, cmd)
+
+def _log_since(log_path, offset):
+    """Text appended to log_path after byte `offset` (the output of one ffmpeg run)."""
+    try:
+        with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+            f.seek(offset)
+            return f.read()
+    except Exception:
+        return ""
+
+def _print_log_tail(log_path, lines=8):
+    try:
+        with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+            tail = f.read().splitlines()[-lines:]
+    except Exception:
+        return
+    print("[WARN] ffmpeg output (last lines):")
+    for line in tail:
+        print("    " + line)
+
+def _remove_quietly(path):
+    try:
+        if os.path.exists(path):
+            os.remove(path)
+    except Exception:
+        pass
+
+def _run_burn(input_path, vf, output_path, crf, label, log_path, audio_args):
+    """
+    Run a single ffmpeg burn attempt with the given video filter.
+    Uses the hardware encoder when available and retries once with libx264 if the hardware
+    encoder fails to start (driver missing, session limit reached, unsupported resolution, ...).
+    """
+    encoder = hw_encoder()
+    cmd = _burn_cmd(input_path, vf, output_path, crf, encoder, audio_args)
+    print(f"[DEBUG] Running ({label}): {' '.join(cmd)}")
+    log_offset = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+    try:
+        _run_ffmpeg(cmd, log_path)
+    except subprocess.CalledProcessError as e:
+        # only an encoder that failed to start is worth a libx264 retry; a subtitle-filter
+        # error would just fail the same way again
+        if encoder is None or not any(m in _log_since(log_path, log_offset) for m in _ENCODER_INIT_ERRORS):
+            raise
+        print(f"[WARN] {encoder} encode failed ({e}); retrying {label} with libx264.")
+        cmd = _burn_cmd(input_path, vf, output_path, crf, None, audio_args)
+        print(f"[DEBUG] Running ({label}, libx264): {' '.join(cmd)}")
+        _run_ffmpeg(cmd, log_path)
+
+def _run_gpu_burn(input_path, subtitle_filter, output_path, crf, log_path, audio_args):
+    """
+    Full GPU pipeline: NVDEC decode -> subtitle overlay -> NVENC encode.
+    Frames stay in GPU memory except for the libass overlay, which needs CPU frames,
+    so only that step does hwdownload/hwupload_cuda.
+    """
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "info",
+        "-hwaccel", "cuda", "-hwaccel_output_format", "cuda",
+        "-i", input_path,
+        "-vf", f"hwdownload,format=nv12,{subtitle_filter},hwupload_cuda",
+        *_video_codec_args(crf, "h264_nvenc"),
+        *audio_args, "-y", output_path
+    ]
+    print(f"[DEBUG] Running (GPU): {' '.join(cmd)}")
+    _run_ffmpeg(cmd, log_path)
+
+def mux_subtitles_ffmpeg(video_path, srt_path, output_dir):
+    """
+    Soft-subtitle mode: stream-copies the video (and the audio, when mp4 can hold it) and muxes
+    the SRT in as a mov_text subtitle track. No video decode or encode, so it runs at disk-copy
+    speed, but there is no caption styling (font, glow, animation).
+    """
+    output_path = _reserve_output_path(output_dir)
+    print(f"[INFO] Muxing soft captions into video: {output_path}")
+    log_path = _log_path_for(output_path)
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "info",
+        "-i", video_path,
+        "-i", srt_path,
+        "-map", "0:v", "-map", "0:a?", "-map", "1:0",
+        "-c:v", "copy", *_audio_codec_args(video_path), "-c:s", "mov_text",
+        "-y", output_path
+    ]
+    print(f"[DEBUG] Running (mux): {' '.join(cmd)}")
+    try:
+        _run_ffmpeg(cmd, log_path)
+    except Exception:
+        try:
+            os.remove(output_path)
+        except Exception:
+            pass
+        print(f"[INFO] Full ffmpeg log: {log_path}")
+        raise
+    _remove_quietly(log_path)
+    print(f"[INFO] Final video saved (soft subtitles): {output_path}")
+    return output_path
+
+def burn_subtitles_ffmpeg(video_path, ass_path, srt_path, output_dir, temp_dir, style, hard_burn=True):
+    """
+    Burns captions into the video. Prioritizes the copied font file via fontsdir: ASS+fontsdir
+    when srt_path is None (only the ASS was written), else SRT+fontsdir. Falls back to ASS
+    (system lookup) then to SRT without fontsdir (if an SRT was written). Encodes with NVENC/VideoToolbox/VAAPI when ffmpeg supports it, else libx264.
+    When the CUDA hwaccel is also present, a full GPU decode/encode pass is tried first.
+    With hard_burn=False the SRT is muxed as a soft subtitle track instead (no video re-encode);
+    ass_path and style are unused then and may be None.
+    """
+    if not hard_burn:
+        return mux_subtitles_ffmpeg(video_path, srt_path, output_dir)
+
+    # ffmpeg writes straight to the final path (no move/copy afterwards)
+    output_path = _reserve_output_path(output_dir)
     print(f"[INFO] Burning captions into video: {output_path}")
+    if hw_encoder():
+        print(f"[INFO] Hardware encoder detected; using {hw_encoder()}.")
 
-    current_dir = os.getcwd()
+    log_path = _log_path_for(output_path)
+    done = False
     try:
-        temp_video = os.path.join(temp_dir, "video.mp4")
-        shutil.copy(video_path, temp_video)
-        os.chdir(temp_dir)
-        temp_output = "output.mp4"
+        # Every path handed to ffmpeg is absolute, so no os.chdir (safe for parallel burns)
+        input_path = os.path.abspath(video_path)
+        audio_args = _audio_codec_args(input_path)
 
         fonts_dir = None
         if style and style.get('font_path') and os.path.isfile(style.get('font_path')):
@@ -32,64 +397,88 @@ def burn_subtitles_ffmpeg(video_path, ass_path, srt_path, output_dir, temp_dir,
             except Exception as e:
                 print(f"[WARN] Could not copy font file to fontsdir: {e}")
 
-        # 1) Try SRT + fontsdir (preferred)
+        # Only attempt tiers whose filter this ffmpeg build has (each attempt re-decodes the video)
+        filters = subtitle_filters_available()
+        has_subtitles = filters is None or "subtitles" in filters
+        has_ass = filters is None or "ass" in filters
+        if not (has_subtitles or has_ass):
+            raise RuntimeError("ffmpeg was built without libass (no 'ass'/'subtitles' filter); cannot hard-burn captions")
+
+        # Escaped once here and shared by every tier that uses them
+        srt_arg = _escape_filter_path(srt_path) if srt_path else None
+        ass_arg = _escape_filter_path(ass_path)
+        fonts_arg = _escape_filter_path(fonts_dir) if fonts_dir else None
+
+        # "downscaled" glow mode: the wide glow layers come from a separate ASS blurred by ffmpeg
+        glow_prefix = ""
+        glow_ass = glow_pass_path(ass_path)
+        if style and style.get('glow_mode') == 'downscaled' and has_ass and os.path.isfile(glow_ass):
+            if filters is None or {"drawbox", "gblur", "blend"} <= filters:
+                glow_prefix = _glow_pass_prefix(_escape_filter_path(glow_ass), fonts_arg)
+            else:
+                print("[WARN] ffmpeg lacks drawbox/gblur/blend; burning without the outer glow pass.")
+
+        vf = None
+        vf_label = None
         if fonts_dir:
-            cmd = [
-                "ffmpeg", "-hide_banner", "-loglevel", "info",
-                "-i", "video.mp4",
-                "-vf", f"subtitles={shlex.quote(os.path.basename(srt_path))}:fontsdir={shlex.quote(fonts_dir)}",
-                "-c:v", "libx264", "-preset", "fast", "-crf", "18",
-                "-c:a", "copy", "-y", temp_output
-            ]
-            print(f"[DEBUG] Running (SRT+fontsdir): {' '.join(cmd)}")
+            if srt_arg is None and has_ass:
+                # No SRT written: libass renders the styled ASS with the copied font file
+                vf = f"{glow_prefix}ass={ass_arg}:fontsdir={fonts_arg}"
+                vf_label = "ASS+fontsdir"
+            elif srt_arg and has_subtitles:
+                vf = f"subtitles={srt_arg}:fontsdir={fonts_arg}"
+                vf_label = "SRT+fontsdir"
+        vf2 = f"{glow_prefix}ass={ass_arg}" if has_ass else None
+        has_srt_fallback = srt_arg is not None and has_subtitles
+
+        # 0) Try the full GPU pipeline with the preferred subtitle filter
+        if (vf or vf2) and cuda_hwaccel_available():
+            try:
+                _run_gpu_burn(input_path, vf or vf2, output_path, 18, log_path, audio_args)
+                print(f"[INFO] Final video saved (GPU): {output_path}")
+                done = True
+                return output_path
+            except subprocess.CalledProcessError as e:
+                print(f"[WARN] GPU pipeline failed: {e}. Trying CPU decode...")
+
+        # 1) Try the copied font via fontsdir (preferred)
+        if vf:
             try:
-                subprocess.run(cmd, check=True)
-                shutil.move(temp_output, output_path)
-                print(f"[INFO] Final video saved (SRT+fontsdir): {output_path}")
+                _run_burn(input_path, vf, output_path, 18, vf_label, log_path, audio_args)
+                print(f"[INFO] Final video saved ({vf_label}): {output_path}")
+                done = True
                 return output_path
             except subprocess.CalledProcessError as e:
-                print(f"[WARN] SRT+fontsdir failed: {e}. Trying ASS...")
+                if not (vf2 or has_srt_fallback):
+                    raise
+                print(f"[WARN] {vf_label} failed: {e}. Trying ASS...")
 
         # 2) Try ASS (system lookup)
-        cmd2 = [
-            "ffmpeg", "-hide_banner", "-loglevel", "info",
-            "-i", "video.mp4",
-            "-vf", f"ass={shlex.quote(os.path.basename(ass_path))}",
-            "-c:v", "libx264", "-preset", "fast", "-crf", "18",
-            "-c:a", "copy", "-y", temp_output
-        ]
-        print(f"[DEBUG] Running (ASS): {' '.join(cmd2)}")
-        try:
-            subprocess.run(cmd2, check=True)
-            shutil.move(temp_output, output_path)
-            print(f"[INFO] Final video saved (ASS): {output_path}")
-            return output_path
-        except subprocess.CalledProcessError:
-            print("[WARN] ASS filter failed; falling back to SRT without fontsdir.")
+        if vf2:
+            try:
+                _run_burn(input_path, vf2, output_path, 18, "ASS", log_path, audio_args)
+                print(f"[INFO] Final video saved (ASS): {output_path}")
+                done = True
+                return output_path
+            except subprocess.CalledProcessError:
+                if not has_srt_fallback:
+                    raise
+                print("[WARN] ASS filter failed; falling back to SRT without fontsdir.")
 
         # 3) Final fallback: SRT without fontsdir
-        cmd3 = [
-            "ffmpeg", "-hide_banner", "-loglevel", "info",
-            "-i", "video.mp4",
-            "-vf", f"subtitles={shlex.quote(os.path.basename(srt_path))}",
-            "-c:v", "libx264", "-preset", "fast", "-crf", "20",
-            "-c:a", "copy", "-y", temp_output
-        ]
-        print(f"[DEBUG] Running (SRT fallback): {' '.join(cmd3)}")
-        subprocess.run(cmd3, check=True)
-        shutil.move(temp_output, output_path)
+        if not has_srt_fallback:
+            raise RuntimeError("no subtitle filter tier could be run for this burn")
+        vf3 = f"subtitles={srt_arg}"
+        _run_burn(input_path, vf3, output_path, 20, "SRT fallback", log_path, audio_args)
         print(f"[INFO] Final video saved (SRT fallback): {output_path}")
+        done = True
         return output_path
 
     finally:
-        os.chdir(current_dir)
-        try:
-            if os.path.exists(temp_video):
-                os.remove(temp_video)
-        except Exception:
-            pass
-        try:
-            if os.path.exists("output.mp4"):
-                os.remove("output.mp4")
-        except Exception:
-            pass
\ No newline at end of file
+        # Don't leave a half-written video behind if every tier failed; keep its log instead
+        if done:
+            _remove_quietly(log_path)
+        else:
+            _remove_quietly(output_path)
+            if os.path.exists(log_path):
+                print(f"[INFO] Full ffmpeg log: {log_path}")
\ No newline at end of file
@@ -1,5 +1,110 @@
 # project/caption_builder.py
-import re
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_SENTENCE_END = ('.', '!', '?')
+
+def _compute_gap_boundaries(words, starts, ends, cont_th, sep_th, sentence_breaks):
+    """
+    Pass 1: boolean mask, True where a word must open a new caption.
+    That is the first word, any word after a pause >= a threshold and,
+    with sentence_breaks, any word following sentence-ending punctuation.
+    """
+    n = len(words)
+    starts_arr = np.asarray(starts, dtype=np.float64)
+    ends_arr = np.asarray(ends, dtype=np.float64)
+
+    # gap >= sep_th or cont_th <= gap < sep_th  <=>  gap >= min(cont_th, sep_th)
+    boundaries = np.empty(n, dtype=bool)
+    np.greater_equal(starts_arr[1:] - ends_arr[:-1], min(cont_th, sep_th), out=boundaries[1:])
+    if sentence_breaks:
+        sentence_end = np.fromiter((w.endswith(_SENTENCE_END) for w in words), dtype=bool, count=n)
+        boundaries[1:] |= sentence_end[:-1]
+    boundaries[0] = True
+    return boundaries
+
+def _enforce_caption_length(boundaries, max_words):
+    """
+    Pass 2: also open a caption every `max_words` words, counted from the start of
+    each run between pass-1 boundaries. Returns sorted caption start indices.
+    """
+    n = len(boundaries)
+    run_first = np.flatnonzero(boundaries)
+    run_id = np.cumsum(boundaries) - 1
+    pos_in_run = np.arange(n) - run_first[run_id]
+    return np.flatnonzero(pos_in_run % max_words == 0)
+
+def _slice_captions(words, starts, ends, caption_starts):
+    """Pass 3: cut the flat word lists at caption_starts into caption dicts."""
+    bounds = caption_starts.tolist() + [len(words)]
+    captions = []
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        cap_words = words[a:b]
+        text = ' '.join(cap_words)  # one join shared by the ASS and SRT text
+        captions.append({
+            'start': starts[a],
+            'end': ends[b - 1],
+            'text_ass': text,   # always one line
+            'text_srt': text,   # always one line
+            'words': cap_words,
+            'starts': starts[a:b],
+            'ends': ends[a:b]
+        })
+    return captions
+
+def _captions_from_arrays(words, starts, ends, limit, cont_th, sep_th, sentence_breaks):
+    """Vectorized grouping of a flat word list into captions (same rules as _group_words), O(n)."""
+    if not words:
+        return []
+    boundaries = _compute_gap_boundaries(words, starts, ends, cont_th, sep_th, sentence_breaks)
+    caption_starts = _enforce_caption_length(boundaries, limit)
+    return _slice_captions(words, starts, ends, caption_starts)
+
+def _group_words(words, starts, ends, limit, cont_th, sep_th, sentence_breaks):
+    """Pure-Python reference for _captions_from_arrays (used when NumPy is not installed)."""
+    captions = []
+
+    def flush(cur_words, cur_starts, cur_ends):
+        """Flush a current caption (parallel word/start/end lists; times are already floats)."""
+        if not cur_words:
+            return
+        text = ' '.join(cur_words)
+        captions.append({
+            'start': cur_starts[0],
+            'end': cur_ends[-1],
+            'text_ass': text,   # always one line
+            'text_srt': text,   # always one line
+            'words': cur_words,
+            'starts': cur_starts,
+            'ends': cur_ends
+        })
+
+    cur_words, cur_starts, cur_ends = [], [], []
+    last_end = None
+    sentence_end = _SENTENCE_END
+    for word_text, w_start, w_end in zip(words, starts, ends):
+        gap = 0 if last_end is None else (w_start - last_end)
+
+        # pause (moderate or long) or caption already full -> end current caption and start a new one
+        if gap >= sep_th or cont_th <= gap < sep_th or len(cur_words) >= limit:
+            flush(cur_words, cur_starts, cur_ends)
+            cur_words, cur_starts, cur_ends = [], [], []
+
+        cur_words.append(word_text)
+        cur_starts.append(w_start)
+        cur_ends.append(w_end)
+
+        # strong punctuation heuristic: if the word ends a sentence, flush immediately
+        if sentence_breaks and word_text.endswith(sentence_end):
+            flush(cur_words, cur_starts, cur_ends)
+            cur_words, cur_starts, cur_ends = [], [], []
+
+        last_end = w_end
+
+    flush(cur_words, cur_starts, cur_ends)
+    return captions
 
 def build_caption_units(data,
                         max_words_per_line=5,
@@ -19,132 +124,59 @@ def build_caption_units(data,
       - 'end' (float seconds)
       - 'text_ass' (always single line, no \\N)
       - 'text_srt' (always single line, no \\n)
-      - 'words' list of (word, start, end)
+      - 'words', 'starts', 'ends': parallel per-word lists (text, start, end)
     """
-    captions = []
-
     # convert thresholds to seconds
     cont_th = float(continue_if_gap_ms) / 1000.0
     sep_th = float(separate_if_gap_ms) / 1000.0
 
-    def flush(curr):
-        """Flush a current caption (list of (word, s, e))."""
-        if not curr:
-            return
-        start = None
-        end = None
-        words_for_meta = []
-        words = []
-        for item in curr:
-            # item is (word, s, e)
-            w, s, e = item
-            if start is None:
-                start = float(s)
-            end = float(e)
-            words.append(w)
-            words_for_meta.append((w, float(s), float(e)))
-
-        if start is None or end is None:
-            return
-
-        captions.append({
-            'start': float(start),
-            'end': float(end),
-            'text_ass': ' '.join(words),   # always one line
-            'text_srt': ' '.join(words),   # always one line
-            'words': words_for_meta
-        })
-
-    # determine if segments have per-word timestamps
-    any_words = any('words' in seg and seg['words'] for seg in data.get('segments', []))
-    if not any_words:
+    segments = data.get('segments', [])
+    words, starts, ends = [], [], []
+
+    # Flatten every segment's words once; a non-empty result means per-word timestamps exist
+    all_words = [w for seg in segments for w in seg.get('words') or ()]
+    any_words = bool(all_words)
+
+    # hot loop: bind callables to locals (LOAD_FAST instead of LOAD_GLOBAL/LOAD_ATTR)
+    _float = float
+    add_word, add_start, add_end = words.append, starts.append, ends.append
+    for w in all_words:
+        word_text = (w.get('word') or '').strip()
+        if not word_text:
+            continue
+        try:
+            w_start = _float(w.get('start', 0.0))
+            w_end = _float(w.get('end', w_start))
+        except Exception:
+            continue
+        add_word(word_text)
+        add_start(w_start)
+        add_end(w_end)
+
+    if any_words:
+        # captions hold at most one line, so the per-line limit also caps a caption;
+        # sentence-ending punctuation always closes the caption
+        limit = max(1, min(max_words_per_line, max_words_per_caption))
+        sentence_breaks = True
+    else:
         # fallback: distribute segment timestamps evenly as older behavior
-        current = []
-        last_end = None
-        for seg in data.get('segments', []):
+        limit = max(1, max_words_per_caption)
+        sentence_breaks = False
+        for seg in segments:
             seg_text = seg.get('text', '').strip()
             if not seg_text:
                 continue
             seg_start = float(seg.get('start', 0.0))
             seg_end = float(seg.get('end', seg_start))
-            seg_words = [w for w in re.split(r"\s+", seg_text) if w]
+            seg_words = seg_text.split()
             if not seg_words:
                 continue
             per_word = (seg_end - seg_start) / max(1, len(seg_words))
             for i, w in enumerate(seg_words):
                 s = seg_start + i * per_word
-                e = s + per_word
-                gap = 0 if last_end is None else s - last_end
-                # flush if big gap or caption too long
-                if gap >= sep_th or len(current) >= max_words_per_caption:
-                    flush(current)
-                    current = []
-                # medium gap: also flush (instead of line break)
-                elif last_end is not None and cont_th <= gap < sep_th and current:
-                    flush(current)
-                    current = []
-                current.append((w, s, e))
-                last_end = e
-        flush(current)
-        return captions
-
-    # With per-word timestamps:
-    current = []
-    last_end = None
-    words_in_current = 0
-    for seg in data.get('segments', []):
-        for w in seg.get('words', []):
-            word_text = (w.get('word') or '').strip()
-            if not word_text:
-                continue
-            try:
-                w_start = float(w.get('start', 0.0))
-                w_end = float(w.get('end', w_start))
-            except Exception:
-                continue
+                words.append(w)
+                starts.append(s)
+                ends.append(s + per_word)
 
-            gap = 0 if last_end is None else (w_start - last_end)
-
-            # if gap >= separate threshold -> end current caption and start a new one
-            if last_end is not None and gap >= sep_th:
-                flush(current)
-                current = []
-                words_in_current = 0
-
-            # if adding this word would exceed max words per caption, flush and start new
-            if words_in_current >= max_words_per_caption:
-                flush(current)
-                current = []
-                words_in_current = 0
-
-            # moderate gaps: instead of line-break, flush caption and start new
-            if last_end is not None and cont_th <= gap < sep_th and current:
-                flush(current)
-                current = []
-                words_in_current = 0
-
-            # add the word
-            current.append((word_text, w_start, w_end))
-            words_in_current += 1
-
-            # enforce per-line maximum: instead of line-break, flush caption
-            rev = list(reversed(current))
-            count_since_break = 0
-            for it in rev:
-                count_since_break += 1
-            if count_since_break >= max_words_per_line:
-                if words_in_current < max_words_per_caption:
-                    flush(current)
-                    current = []
-                    words_in_current = 0
-
-            # strong punctuation heuristic: if the word ends a sentence, flush immediately
-            if re.search(r'[\.!\?]$', word_text):
-                flush(current)
-                current = []
-                words_in_current = 0
-
-            last_end = w_end
-
-    flush(current)
-    return captions
+    group = _captions_from_arrays if np is not None else _group_words
+    return group(words, starts, ends, limit, cont_th, sep_th, sentence_breaks)
@@ -2,12 +2,28 @@
 import os
 import sys
 import re
-import subprocess
 import json
+import struct
+import subprocess
+import functools
 
-def format_time_ass(t: float) -> str:
-    """Format time for ASS (centiseconds precision): H:MM:SS.cc"""
-    total_cs = int(round(t * 100))  # centiseconds
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_ASS_HEX_RE = re.compile(r"&H[0-9A-Fa-f]{8}$")
+_HEX6_RE = re.compile(r"#?([0-9A-Fa-f]{6})$")
+
+# The scalar formatters are memoized on the rounded integer time, so equal timestamps
+# (a caption's end is often the next one's start) and floats that round alike are formatted once
+@functools.lru_cache(maxsize=65536)
+def _format_cs_ass(total_cs: int) -> str:
     cs = total_cs % 100
     total_seconds = total_cs // 100
     s = total_seconds % 60
@@ -15,9 +31,8 @@ def format_time_ass(t: float) -> str:
     h = total_seconds // 3600
     return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
 
-def format_time_srt(t: float) -> str:
-    """Format time for SRT (milliseconds precision): HH:MM:SS,mmm"""
-    total_ms = int(round(t * 1000))
+@functools.lru_cache(maxsize=65536)
+def _format_ms_srt(total_ms: int) -> str:
     ms = total_ms % 1000
     total_seconds = total_ms // 1000
     s = total_seconds % 60
@@ -25,6 +40,37 @@ def format_time_srt(t: float) -> str:
     h = total_seconds // 3600
     return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
 
+def format_time_ass(t: float) -> str:
+    """Format time for ASS (centiseconds precision): H:MM:SS.cc"""
+    return _format_cs_ass(int(round(t * 100)))  # centiseconds
+
+def format_time_srt(t: float) -> str:
+    """Format time for SRT (milliseconds precision): HH:MM:SS,mmm"""
+    return _format_ms_srt(int(round(t * 1000)))
+
+def format_times_ass_batch(times):
+    """Vectorized format_time_ass for a sequence of seconds; returns a list of strings."""
+    if np is None:
+        return [format_time_ass(t) for t in times]
+    total_cs = np.rint(np.asarray(times, dtype=np.float64) * 100).astype(np.int64)
+    h = total_cs // 360_000
+    m = (total_cs // 6_000) % 60
+    s = (total_cs // 100) % 60
+    cs = total_cs % 100
+    return [f"{h_}:{m_:02d}:{s_:02d}.{cs_:02d}" for h_, m_, s_, cs_ in zip(h.tolist(), m.tolist(), s.tolist(), cs.tolist())]
+
+def format_times_srt_batch(times):
+    """Vectorized format_time_srt for a sequence of seconds; returns a list of strings."""
+    if np is None:
+        return [format_time_srt(t) for t in times]
+    total_ms = np.rint(np.asarray(times, dtype=np.float64) * 1000).astype(np.int64)
+    h = total_ms // 3_600_000
+    m = (total_ms // 60_000) % 60
+    s = (total_ms // 1000) % 60
+    ms = total_ms % 1000
+    return [f"{h_:02d}:{m_:02d}:{s_:02d},{ms_:03d}" for h_, m_, s_, ms_ in zip(h.tolist(), m.tolist(), s.tolist(), ms.tolist())]
+
+@functools.lru_cache(maxsize=64)
 def normalize_hex_color_to_ass(hexstr: str) -> str:
     """Accepts formats like '#RRGGBB' or 'RRGGBB' or already ASS form '&H00BBGGRR' and
     returns ASS primary colour string like '&H00BBGGRR'. If input invalid returns default white.
@@ -33,10 +79,10 @@ def normalize_hex_color_to_ass(hexstr: str) -> str:
         return "&H00FFFFFF"
     hexstr = hexstr.strip()
     if hexstr.startswith("&H"):
-        if re.match(r"&H[0-9A-Fa-f]{8}$", hexstr):
+        if _ASS_HEX_RE.match(hexstr):
             return hexstr
         return "&H00FFFFFF"
-    m = re.match(r"#?([0-9A-Fa-f]{6})$", hexstr)
+    m = _HEX6_RE.match(hexstr)
     if not m:
         return "&H00FFFFFF"
     rrggbb = m.group(1)
@@ -45,22 +91,137 @@ def normalize_hex_color_to_ass(hexstr: str) -> str:
     bb = rrggbb[4:6]
     return f"&H00{bb}{gg}{rr}".upper()
 
+def write_json(path, obj, indent=False):
+    """Write obj to path as UTF-8 JSON (orjson when installed, else json); indent=True for 2-space output."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(obj, option=option))
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2 if indent else None)
+
+def read_json(path):
+    """Load a JSON file (orjson when installed, else json)."""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+_MP4_EXTENSIONS = ('.mp4', '.mov', '.m4v')
+
+def _iter_boxes(f, start, end):
+    """Yield (type, payload_start, box_end) for the ISO-BMFF boxes between start and end."""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        header = f.read(16)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack('>I4s', header[:8])
+        payload = pos + 8
+        if size == 1:  # 64-bit largesize follows the type
+            if len(header) < 16:
+                return
+            size = struct.unpack('>Q', header[8:16])[0]
+            payload = pos + 16
+        elif size == 0:  # box runs to the end of its parent
+            size = end - pos
+        if size < payload - pos:
+            return
+        yield box_type, payload, pos + size
+        pos += size
+
+def _child_box(f, start, end, box_type):
+    for t, payload, box_end in _iter_boxes(f, start, end):
+        if t == box_type:
+            return payload, box_end
+    return None
+
+def _mp4_resolution(video_path):
+    """
+    (width, height) of the first video track, read from the MP4/MOV box tree
+    (moov/trak/mdia/minf/stbl/stsd visual sample entry - the same coded size ffprobe reports).
+    Only a few hundred bytes are read; the mdat payload is seeked over. Returns None if not found.
+    """
+    with open(video_path, 'rb') as f:
+        moov = _child_box(f, 0, os.fstat(f.fileno()).st_size, b'moov')
+        if moov is None:
+            return None
+        for t, trak_start, trak_end in _iter_boxes(f, *moov):
+            if t != b'trak':
+                continue
+            mdia = _child_box(f, trak_start, trak_end, b'mdia')
+            hdlr = mdia and _child_box(f, *mdia, b'hdlr')
+            if not hdlr:
+                continue
+            f.seek(hdlr[0] + 8)  # version/flags, pre_defined, then handler_type
+            if f.read(4) != b'vide':
+                continue
+            minf = _child_box(f, *mdia, b'minf')
+            stbl = minf and _child_box(f, *minf, b'stbl')
+            stsd = stbl and _child_box(f, *stbl, b'stsd')
+            if not stsd:
+                return None
+            # version/flags + entry_count (8), entry header (8), reserved + data_ref_index (8),
+            # pre_defined/reserved (16), then width, height
+            f.seek(stsd[0] + 40)
+            data = f.read(4)
+            if len(data) < 4:
+                return None
+            width, height = struct.unpack('>HH', data)
+            return (width, height) if width and height else None
+    return None
+
+@functools.lru_cache(maxsize=32)
+def _probe_resolution(video_path, key):
+    """(width, height) from the MP4 header when possible, else ffprobe. `key` = (mtime, size) so edited files are re-probed."""
+    if video_path.lower().endswith(_MP4_EXTENSIONS):
+        try:
+            resolution = _mp4_resolution(video_path)
+        except (OSError, struct.error):
+            resolution = None
+        if resolution:
+            return resolution
+    cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "stream=width,height",
+        "-of", "csv=p=0",
+        video_path
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True, bufsize=1 << 16)
+    width, height = map(int, result.stdout.strip().splitlines()[0].split(',')[:2])
+    return width, height
+
 def get_video_resolution(video_path):
-    """Get video resolution using ffprobe (best-effort)."""
+    """Get video resolution from the container header or ffprobe (best-effort, cached per file version)."""
     try:
-        cmd = [
-            "ffprobe",
-            "-v", "error",
-            "-select_streams", "v:0",
-            "-show_entries", "stream=width,height",
-            "-of", "json",
-            video_path
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        data = json.loads(result.stdout)
-        width = int(data['streams'][0]['width'])
-        height = int(data['streams'][0]['height'])
-        return width, height
+        key = (os.path.getmtime(video_path), os.path.getsize(video_path))
+        return _probe_resolution(video_path, key)
     except Exception as e:
         print(f"[WARN] ffprobe failed to get resolution ({e}). Using 1920x1080 fallback.")
-        return 1920, 1080
\ No newline at end of file
+        return 1920, 1080
+
+def get_audio_codecs(video_path):
+    """
+    Codec names of every audio stream (e.g. ['aac', 'opus']), [] if the file has no audio,
+    or None if ffprobe couldn't tell.
+    """
+    cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "a",
+        "-show_entries", "stream=codec_name",
+        "-of", "csv=p=0",
+        video_path
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    except Exception:
+        return None
+    return [line.strip() for line in result.stdout.splitlines() if line.strip()]
\ No newline at end of file
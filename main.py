@@ -1,132 +1,292 @@
 # project/main.py
 import os
 import sys
+import glob
+import threading
+import contextlib
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed, TimeoutError as FutureTimeout
 from transcription import transcribe_video, review_transcription
 from caption_builder import build_caption_units
-from subtitle import get_user_font_choice, write_subtitles_files
-from burner import burn_subtitles_ffmpeg
+from subtitle import get_user_font_choice, write_subtitles_files, GLOW_MODES
+from burner import burn_subtitles_ffmpeg, nvenc_available
 from helpers import get_video_resolution, normalize_hex_color_to_ass
 from datetime import datetime
 import json
 import tempfile
 import shutil
 
-def create_and_burn(video_path, model_size='medium'):
-    temp_dir = tempfile.mkdtemp(prefix='captions_')
-    temp_files = []
+DEFAULT_CONTINUE_MS = 200
+DEFAULT_SEPARATE_MS = 600
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.mkv')
+# Consumer NVIDIA cards only allow a few concurrent NVENC sessions
+MAX_NVENC_SESSIONS = 3
+
+def ask_pause_thresholds():
+    """Ask thresholds (ms) so user can override defaults. Returns (continue_ms, separate_ms)."""
+    try:
+        print("\n[PAUSE THRESHOLDS in milliseconds]")
+        cont_ms_in = input(f"Continue same line if gap < ms (default {DEFAULT_CONTINUE_MS}): ").strip()
+        sep_ms_in = input(f"Treat gap >= ms as separate caption (vanish) (default {DEFAULT_SEPARATE_MS}): ").strip()
+        continue_if_gap_ms = int(cont_ms_in) if cont_ms_in else DEFAULT_CONTINUE_MS
+        separate_if_gap_ms = int(sep_ms_in) if sep_ms_in else DEFAULT_SEPARATE_MS
+        if separate_if_gap_ms <= continue_if_gap_ms:
+            print("[WARN] separate threshold must be > continue threshold; using defaults.")
+            continue_if_gap_ms = DEFAULT_CONTINUE_MS
+            separate_if_gap_ms = DEFAULT_SEPARATE_MS
+    except Exception:
+        continue_if_gap_ms = DEFAULT_CONTINUE_MS
+        separate_if_gap_ms = DEFAULT_SEPARATE_MS
+    return continue_if_gap_ms, separate_if_gap_ms
+
+def default_font_size(height):
+    return int(max(24, height * 0.05))
+
+def ask_style(height=None):
+    """
+    Ask font and caption styling. When height is None (batch mode, one answer for many videos)
+    an empty font size is stored as None and resolved per video from its own height.
+    """
+    # ---------------- FONT CHOICE ----------------
+    font_name, font_path = get_user_font_choice()
+
+    # Caption style defaults. Ask user for vertical placement
+    default_size = default_font_size(height) if height else None
+    print('\n[STYLE] Caption styling configuration (press Enter to accept default)')
+    size_hint = default_size if default_size else "5% of video height"
+    font_size_input = input(f"Font size in px (default {size_hint}): ").strip()
+    try:
+        font_size = int(font_size_input) if font_size_input else default_size
+    except Exception:
+        font_size = default_size
+
+    font_color = input("Font color hex (e.g. #FFFFFF) [#FFFFFF]: ").strip() or "#FFFFFF"
+    outline_color = input("Outline color hex (e.g. #000000) [#000000]: ").strip() or "#000000"
+
+    print("Position options: bottom, lower-center, center, top")
+    position = input("Choose position [bottom]: ").strip() or "bottom"
 
+    shadow = input("Shadow size (pixels) [2]: ").strip() or '2'
     try:
-        if not os.path.isfile(video_path):
-            print('[ERROR] Video file not found:', video_path)
+        shadow = float(shadow)
+    except Exception:
+        shadow = 2.0
+
+    print("Glow options: full (layered, best look), lite (two outer glow layers, faster burn),")
+    print("              single (one glow layer, fastest burn),")
+    print("              downscaled (full look, widest glows blurred by ffmpeg at 1/4 size)")
+    glow_mode = input("Choose glow [full]: ").strip().lower() or "full"
+    if glow_mode not in GLOW_MODES:
+        print("[WARN] Unknown glow option; using full.")
+        glow_mode = "full"
+
+    return {
+        'font_name': font_name,
+        'font_path': font_path,
+        'font_size': font_size,
+        'font_color': font_color,
+        'outline_color': outline_color,
+        'position': position,
+        'shadow': shadow,
+        'glow_mode': glow_mode
+    }
+
+class _HeldOutput:
+    """
+    Stand-in for sys.stdout/sys.stderr that passes writes from the thread that created it straight
+    through and holds back everything written from other threads until release().
+    """
+    def __init__(self, stream):
+        self._stream = stream
+        self._owner = threading.get_ident()
+        self._held = []
+
+    def write(self, text):
+        if threading.get_ident() == self._owner:
+            return self._stream.write(text)
+        self._held.append(text)
+        return len(text)
+
+    def release(self):
+        held, self._held = self._held, []
+        if held:
+            self._stream.write("".join(held))
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        # fileno()/isatty() etc. come from the real stream, so input() still uses readline
+        return getattr(self._stream, name)
+
+@contextlib.contextmanager
+def _hold_background_output():
+    """Hold back background-thread output while the user answers prompts; it is printed on exit."""
+    out, err = _HeldOutput(sys.stdout), _HeldOutput(sys.stderr)
+    sys.stdout, sys.stderr = out, err
+    try:
+        yield
+    finally:
+        sys.stdout, sys.stderr = out._stream, err._stream
+        out.release()
+        err.release()
+
+def _run_in_background(fn, *args, **kwargs):
+    """
+    Run fn on a daemon thread and return a Future for its result. A daemon thread (unlike a
+    ThreadPoolExecutor worker, which is joined at exit) doesn't keep Ctrl+C waiting for Whisper.
+    """
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
             return
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
 
-        # Ask thresholds (ms) so user can override defaults
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+def _join(future):
+    """future.result(), polled: a plain blocking wait doesn't see Ctrl+C on Windows."""
+    while True:
         try:
-            print("\n[PAUSE THRESHOLDS in milliseconds]")
-            default_continue_ms = 200
-            default_separate_ms = 600
-            cont_ms_in = input(f"Continue same line if gap < ms (default {default_continue_ms}): ").strip()
-            sep_ms_in = input(f"Treat gap >= ms as separate caption (vanish) (default {default_separate_ms}): ").strip()
-            continue_if_gap_ms = int(cont_ms_in) if cont_ms_in else default_continue_ms
-            separate_if_gap_ms = int(sep_ms_in) if sep_ms_in else default_separate_ms
-            if separate_if_gap_ms <= continue_if_gap_ms:
-                print("[WARN] separate threshold must be > continue threshold; using defaults.")
-                continue_if_gap_ms = default_continue_ms
-                separate_if_gap_ms = default_separate_ms
-        except Exception:
-            continue_if_gap_ms = default_continue_ms
-            separate_if_gap_ms = default_separate_ms
-
-        output_dir = os.path.dirname(video_path) or os.getcwd()
-        resolution = get_video_resolution(video_path)
+            return future.result(timeout=0.2)
+        except FutureTimeout:
+            pass
 
-        json_path, transcription = transcribe_video(video_path, temp_dir, model_size=model_size)
-        json_path, transcription = review_transcription(json_path, transcription)
+def build_and_burn(video_path, transcription, temp_dir, resolution, hard_burn, continue_if_gap_ms, separate_if_gap_ms, style):
+    """Build captions from a finished transcription, write the subtitle files into temp_dir and burn/mux them."""
+    # Build captions with user-controlled thresholds
+    captions = build_caption_units(
+        transcription,
+        max_words_per_line=5,
+        max_words_per_caption=4,
+        continue_if_gap_ms=continue_if_gap_ms,
+        separate_if_gap_ms=separate_if_gap_ms
+    )
 
-        # ---------------- FONT CHOICE ----------------
-        font_name, font_path = get_user_font_choice()
+    if not captions:
+        print('[ERROR] No captions built')
+        return
 
-        # Caption style defaults. Ask user for vertical placement
-        width, height = resolution
-        default_font_size = int(max(24, height * 0.05))
-        print('\n[STYLE] Caption styling configuration (press Enter to accept default)')
-        font_size_input = input(f"Font size in px (default {default_font_size}): ").strip()
-        try:
-            font_size = int(font_size_input) if font_size_input else default_font_size
-        except Exception:
-            font_size = default_font_size
+    parsed_json = os.path.join(temp_dir, 'captions_parsed.json')
+    with open(parsed_json, 'w', encoding='utf-8') as pj:
+        json.dump(captions, pj, ensure_ascii=False, indent=2)
 
-        font_color = input("Font color hex (e.g. #FFFFFF) [#FFFFFF]: ").strip() or "#FFFFFF"
-        outline_color = input("Outline color hex (e.g. #000000) [#000000]: ").strip() or "#000000"
+    # Write SRT/ASS. Soft subtitles only need the SRT; a hard burn with a usable font file
+    # renders the ASS with fontsdir, so there the SRT is only needed for the no-font-file fallbacks
+    if hard_burn:
+        font_path = style.get('font_path')
+        write_srt = not (font_path and os.path.isfile(font_path))
+        srt_path, ass_path = write_subtitles_files(captions, style, resolution, temp_dir, write_srt=write_srt)
+    else:
+        srt_path, ass_path = write_subtitles_files(captions, {}, resolution, temp_dir, write_ass=False)
 
-        print("Position options: bottom, lower-center, center, top")
-        position = input("Choose position [bottom]: ").strip() or "bottom"
+    # Burn subtitles
+    output_dir = os.path.dirname(video_path) or os.getcwd()
+    output_video = burn_subtitles_ffmpeg(video_path, ass_path, srt_path, output_dir, temp_dir, style, hard_burn=hard_burn)
+    print('[DONE] Output video:', output_video)
+    return output_video
 
-        shadow = input("Shadow size (pixels) [2]: ").strip() or '2'
-        try:
-            shadow = float(shadow)
-        except Exception:
-            shadow = 2.0
-
-        style = {
-            'font_name': font_name,
-            'font_path': font_path,
-            'font_size': font_size,
-            'font_color': font_color,
-            'outline_color': outline_color,
-            'position': position,
-            'shadow': shadow
-        }
-
-        # Build captions with user-controlled thresholds
-        captions = build_caption_units(
-            transcription,
-            max_words_per_line=5,
-            max_words_per_caption=4,
-            continue_if_gap_ms=continue_if_gap_ms,
-            separate_if_gap_ms=separate_if_gap_ms
-        )
-
-        if not captions:
-            print('[ERROR] No captions built')
-            return
+def create_and_burn(video_path, model_size='medium', hard_burn=True):
+    """Interactive flow for one video: transcribe, review, caption and burn."""
+    if not os.path.isfile(video_path):
+        print('[ERROR] Video file not found:', video_path)
+        return
 
-        parsed_json = os.path.join(temp_dir, 'captions_parsed.json')
-        with open(parsed_json, 'w', encoding='utf-8') as pj:
-            json.dump(captions, pj, ensure_ascii=False, indent=2)
-        temp_files.append(parsed_json)
+    temp_dir = tempfile.mkdtemp(prefix='captions_')
+    try:
+        resolution = get_video_resolution(video_path)
+        width, height = resolution
 
-        # Write SRT/ASS
-        srt_path, ass_path = write_subtitles_files(captions, style, resolution, temp_dir)
-        temp_files.extend([srt_path, ass_path])
+        # Transcribe in the background while the user answers the threshold/style prompts;
+        # only the transcript review has to wait for it. Its output is printed once it is joined
+        with _hold_background_output():
+            transcribing = _run_in_background(transcribe_video, video_path, temp_dir, model_size=model_size)
+            continue_if_gap_ms, separate_if_gap_ms = ask_pause_thresholds()
+            if transcribing.done():
+                transcribing.result()  # a failed transcription surfaces before the style prompts
+            # soft subtitles are plain mov_text: no font, colour or glow to ask about
+            style = ask_style(height) if hard_burn else None
+            json_path, transcription = _join(transcribing)
 
-        # Burn subtitles
-        output_video = burn_subtitles_ffmpeg(video_path, ass_path, srt_path, output_dir, temp_dir, style)
-        print('[DONE] Output video:', output_video)
+        json_path, transcription = review_transcription(json_path, transcription)
+        return build_and_burn(video_path, transcription, temp_dir, resolution, hard_burn,
+                              continue_if_gap_ms, separate_if_gap_ms, style)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
 
+def _batch_burn(video_path, transcription, temp_dir, hard_burn, settings):
+    """Batch worker process: everything after transcription for one video. Removes temp_dir when done."""
+    try:
+        resolution = get_video_resolution(video_path)
+        continue_if_gap_ms, separate_if_gap_ms, style = settings
+        if hard_burn and not style.get('font_size'):
+            style = dict(style, font_size=default_font_size(resolution[1]))
+        return build_and_burn(video_path, transcription, temp_dir, resolution, hard_burn,
+                              continue_if_gap_ms, separate_if_gap_ms, style)
     finally:
-        for p in temp_files:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def burn_directory(dir_path, model_size='medium', hard_burn=True):
+    """
+    Batch mode: caption every video in dir_path with one set of settings. Transcription runs here,
+    one video at a time with a single loaded Whisper model (parallel models exhaust VRAM/RAM);
+    only the ffmpeg burns run in parallel worker processes, each starting as soon as its
+    transcript is ready.
+    """
+    videos = sorted(
+        p for p in glob.glob(os.path.join(dir_path, '*'))
+        if os.path.isfile(p) and p.lower().endswith(VIDEO_EXTENSIONS)
+    )
+    if not videos:
+        print('[ERROR] No videos (' + ', '.join(VIDEO_EXTENSIONS) + ') found in:', dir_path)
+        return
+
+    print(f"[INFO] Batch mode: {len(videos)} video(s). Settings below apply to all of them.")
+    continue_if_gap_ms, separate_if_gap_ms = ask_pause_thresholds()
+    style = ask_style() if hard_burn else None
+    settings = (continue_if_gap_ms, separate_if_gap_ms, style)
+
+    workers = max(1, (os.cpu_count() or 2) // 2)
+    if hard_burn and nvenc_available():
+        workers = min(workers, MAX_NVENC_SESSIONS)
+    workers = min(workers, len(videos))
+    print(f"[INFO] Burning with {workers} worker process(es)...")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for v in videos:
+            temp_dir = tempfile.mkdtemp(prefix='captions_')
             try:
-                if os.path.exists(p):
-                    os.remove(p)
-            except Exception:
-                pass
-        try:
-            shutil.rmtree(temp_dir, ignore_errors=True)
-        except Exception:
-            pass
+                _, transcription = transcribe_video(v, temp_dir, model_size=model_size)
+            except Exception as e:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+                print(f"[ERROR] Transcription failed ({v}): {e}")
+                continue
+            futures[pool.submit(_batch_burn, v, transcription, temp_dir, hard_burn, settings)] = v
+        for fut in as_completed(futures):
+            try:
+                fut.result()
+            except Exception as e:
+                print(f"[ERROR] Failed ({futures[fut]}): {e}")
 
 def main():
     print('=== Enhanced Caption Burner (BY @myexistences) ===')
+    burn_in = input('Hard-burn captions into the video? n = soft subtitle track, no re-encode (y/n) [y]: ').strip().lower() or 'y'
+    hard_burn = burn_in != 'n'
     while True:
-        video_path = input('Enter full path to video file (or type quit to exit): ').strip('"')
+        video_path = input('Enter full path to video file or folder (or type quit to exit): ').strip('"')
         if not video_path:
             continue
         if video_path.lower() in ('q', 'quit', 'exit'):
             break
         model_size = input("Whisper model size (tiny, base, small, medium, large) [medium]: ").strip() or 'medium'
         try:
-            create_and_burn(video_path, model_size=model_size)
+            if os.path.isdir(video_path):
+                burn_directory(video_path, model_size=model_size, hard_burn=hard_burn)
+            else:
+                create_and_burn(video_path, model_size=model_size, hard_burn=hard_burn)
         except Exception as e:
             print(f"[ERROR] Failed: {e}")
 
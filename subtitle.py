@@ -3,23 +3,335 @@
 # Replicates the look of professional editing software like After Effects
 
 import os
-import re
-from helpers import format_time_ass, format_time_srt, normalize_hex_color_to_ass
+import json
+import functools
+import importlib.util
+import mmap
+import struct
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from helpers import format_times_ass_batch, format_times_srt_batch, normalize_hex_color_to_ass
 
 try:
-    from fontTools.ttLib import TTFont
+    import numpy as np
 except ImportError:
-    print("[WARN] fontTools not installed; font name extraction may be limited.")
-    TTFont = None
+    np = None
 
 try:
-    from matplotlib import font_manager
+    from rapidfuzz import fuzz, process as fuzz_process
 except ImportError:
-    font_manager = None
+    fuzz_process = None
+
+# safety margin (ms) to avoid equal boundaries causing visible overlap; small value
+SAFETY_MARGIN_MS = 8
+
+@functools.lru_cache(maxsize=1)
+def _get_ttfont():
+    """Import fontTools' TTFont once, on first use (None if fontTools is missing)."""
+    if importlib.util.find_spec("fontTools") is None:
+        print("[WARN] fontTools not installed; font name extraction may be limited.")
+        return None
+    from fontTools.ttLib import TTFont
+    return TTFont
+
+@functools.lru_cache(maxsize=1)
+def _get_font_manager():
+    """Import matplotlib's font_manager once, on first use (None if matplotlib is missing)."""
+    if importlib.util.find_spec("matplotlib") is None:
+        return None
+    from matplotlib import font_manager
+    return font_manager
+
+# On-disk cache of the installed-font list, so warm runs skip fc-list/the font scan/matplotlib
+FONT_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "videocap", "fonts.json")
+FONT_DIRS = [
+    '/usr/share/fonts',
+    '/usr/local/share/fonts',
+    os.path.expanduser('~/.fonts'),
+    os.path.expanduser('~/.local/share/fonts'),
+    '/Library/Fonts',
+    '/System/Library/Fonts',
+    os.path.expanduser('~/Library/Fonts'),
+]
+if os.name == 'nt':
+    # Windows only: elsewhere an unset WINDIR/LOCALAPPDATA would make these paths relative to the cwd
+    _win_dirs = [os.path.join(os.environ.get('WINDIR', r'C:\Windows'), 'Fonts')]
+    if os.environ.get('LOCALAPPDATA'):
+        _win_dirs.append(os.path.join(os.environ['LOCALAPPDATA'], 'Microsoft', 'Windows', 'Fonts'))
+    FONT_DIRS[:0] = _win_dirs
+FONT_EXTENSIONS = ('.ttf', '.otf', '.ttc')
+
+def _font_dirs_signature():
+    """
+    [mtime_ns, entry count] of every existing font directory. The newest mtime of the directory
+    and its immediate subdirectories is used, since fonts usually live one level down
+    (e.g. /usr/share/fonts/truetype); installing/removing a font changes the signature.
+    """
+    sig = {}
+    for d in FONT_DIRS:
+        try:
+            mtime = os.stat(d).st_mtime_ns
+            count = 0
+            with os.scandir(d) as it:
+                for entry in it:
+                    count += 1
+                    if entry.is_dir():
+                        mtime = max(mtime, entry.stat().st_mtime_ns)
+        except OSError:
+            continue
+        sig[d] = [mtime, count]
+    return sig
+
+def _safe_font_names(path):
+    try:
+        return _read_font_names(path)
+    except Exception:
+        return None, None
+
+# Subfamily (style) names of a family's upright, normal-weight face
+_REGULAR_STYLES = frozenset({'regular', 'normal', 'book', 'roman', 'standard'})
+
+def _face_rank(path, style):
+    """
+    Sort key for picking one file per family: the regular face first (that file is copied into
+    fontsdir for the burn), then the shortest file name (arial.ttf before arialbd.ttf when the
+    style is unknown), then the path, so the choice is deterministic.
+    """
+    if style is None:
+        style_rank = 1
+    else:
+        style_rank = 0 if style.strip().lower() in _REGULAR_STYLES else 2
+    return style_rank, len(os.path.basename(path)), path
+
+def _dedupe_fonts(entries):
+    """
+    One entry per font name from (name, path, style) triples (style may be None), preferring
+    the regular face; sorted by name. Single pass plus one sort of the unique names.
+    """
+    best = {}
+    for name, path, style in entries:
+        rank = _face_rank(path, style)
+        if name not in best or rank < best[name][0]:
+            best[name] = (rank, path)
+    return sorted((name, path) for name, (_, path) in best.items())
+
+def _scan_font_dirs():
+    """(name, path) for every font file under FONT_DIRS; name-table reads run on a thread pool."""
+    files = set()
+    for d in FONT_DIRS:
+        for root, _, names in os.walk(d):
+            files.update(os.path.join(root, n) for n in names if n.lower().endswith(FONT_EXTENSIONS))
+    if not files:
+        return []
+    files = list(files)
+    with ThreadPoolExecutor(max_workers=min(16, (os.cpu_count() or 1) * 2)) as pool:
+        names = list(pool.map(_safe_font_names, files))
+    return _dedupe_fonts((name, path, style) for (name, style), path in zip(names, files) if name)
+
+_WIN_FONT_KEYS = (
+    ("HKEY_LOCAL_MACHINE", r"SOFTWARE\Microsoft\Windows NT\CurrentVersion\Fonts"),
+    ("HKEY_CURRENT_USER", r"SOFTWARE\Microsoft\Windows NT\CurrentVersion\Fonts"),
+)
+
+def _list_system_fonts():
+    """
+    (name, path) pairs from the OS font registry, without opening any font file:
+    the Windows Fonts registry keys, or fontconfig's `fc-list` elsewhere. Empty if neither is usable.
+    """
+    pairs = []
+    if os.name == 'nt':
+        import winreg
+        fonts_dir = FONT_DIRS[0]
+        for hive, key_path in _WIN_FONT_KEYS:
+            try:
+                key = winreg.OpenKey(getattr(winreg, hive), key_path)
+            except OSError:
+                continue
+            with key:
+                for i in range(winreg.QueryInfoKey(key)[1]):
+                    value_name, file_name, _ = winreg.EnumValue(key, i)
+                    if not str(file_name).lower().endswith(FONT_EXTENSIONS):
+                        continue
+                    # "Arial Bold (TrueType)" -> "Arial Bold"; a TTC lists "Cambria & Cambria Math"
+                    name = value_name.split(' (')[0].split(' & ')[0].strip()
+                    pairs.append((name, os.path.join(fonts_dir, file_name), None))
+    elif shutil.which('fc-list'):
+        try:
+            result = subprocess.run(
+                ['fc-list', '--format', '%{family[0]}\t%{style[0]}\t%{file}\n'],
+                capture_output=True, text=True, timeout=3, check=True
+            )
+        except Exception:
+            return []
+        for line in result.stdout.splitlines():
+            name, style, path = (line.split('\t', 2) + ['', ''])[:3]
+            if name and path.lower().endswith(FONT_EXTENSIONS):
+                pairs.append((name, path, style or None))
+    return _dedupe_fonts(pairs)
+
+def load_installed_fonts():
+    """
+    Sorted (font_name, font_path) list of installed fonts, or None if it can't be determined.
+    Served from FONT_CACHE while the font directories are unchanged; otherwise rebuilt from the OS
+    font registry (fc-list / Windows registry), else by scanning FONT_DIRS, else matplotlib's
+    font manager, and written back atomically.
+    """
+    sig = _font_dirs_signature()
+    try:
+        with open(FONT_CACHE, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('sig') == sig:
+            return [tuple(item) for item in cached['fonts']]
+    except Exception:
+        pass
+
+    fonts = _list_system_fonts() or _scan_font_dirs()
+    if not fonts:
+        font_manager = _get_font_manager()
+        if not font_manager:
+            return None
+        fonts = sorted({f.name: f.fname for f in font_manager.fontManager.ttflist}.items())
+    try:
+        os.makedirs(os.path.dirname(FONT_CACHE), exist_ok=True)
+        tmp_path = f"{FONT_CACHE}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'sig': sig, 'fonts': fonts}, f, ensure_ascii=False)
+        os.replace(tmp_path, FONT_CACHE)
+    except Exception as e:
+        print(f"[WARN] Could not write font cache ({e})")
+    return fonts
+
+@functools.lru_cache(maxsize=1)
+def _font_index():
+    """Installed fonts plus a lowercased name -> (name, path) lookup, built once per process."""
+    fonts = load_installed_fonts()
+    if fonts is None:
+        return None, None
+    return fonts, {name.lower(): (name, path) for name, path in fonts}
+
+def _read_font_name(path):
+    """
+    Read the family name (nameID 1, else full name nameID 4) straight from the sfnt 'name'
+    table of a TTF/OTF (first face of a TTC) without parsing any other table.
+    Returns None if the file isn't a plain sfnt or has no usable name record.
+    """
+    return _read_font_names(path)[0]
+
+def _read_font_names(path):
+    """(family, subfamily) as read by _read_font_name; subfamily is nameID 2 (e.g. 'Bold'). Either may be None."""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        base = 0
+        if mm[:4] == b'ttcf':
+            base = struct.unpack_from('>I', mm, 12)[0]
+        num_tables = struct.unpack_from('>H', mm, base + 4)[0]
+        for i in range(num_tables):
+            tag, _, offset, _ = struct.unpack_from('>4sIII', mm, base + 12 + 16 * i)
+            if tag == b'name':
+                break
+        else:
+            return None, None
+
+        _, count, string_offset = struct.unpack_from('>HHH', mm, offset)
+        best = None
+        best_style = None
+        for i in range(count):
+            platform_id, encoding_id, _, name_id, length, str_off = struct.unpack_from('>6H', mm, offset + 6 + 12 * i)
+            if name_id not in (1, 2, 4) or platform_id not in (3, 1):
+                continue
+            record = (platform_id, offset + string_offset + str_off, length)
+            if name_id == 2:
+                if best_style is None or (platform_id == 3) > (best_style[0] == 3):
+                    best_style = record
+                continue
+            # nameID 1 beats 4, Windows (UTF-16BE) beats Mac Roman
+            rank = (name_id != 1, platform_id != 3)
+            if best is None or rank < best[0]:
+                best = (rank,) + record
+
+        def decode(platform_id, start, length):
+            raw = mm[start:start + length]
+            text = raw.decode('utf-16-be' if platform_id == 3 else 'mac_roman', errors='ignore').strip()
+            return text or None
+
+        name = decode(*best[1:]) if best else None
+        style = decode(*best_style) if best_style else None
+        return name, style
+
+@functools.lru_cache(maxsize=64)
+def _font_internal_name(path, sig):
+    """
+    Internal (ASS) name of a font file, or None. `sig` = (mtime, size) so an edited file is re-read.
+    Tries the direct name-table read first and fontTools only for files that isn't enough for.
+    """
+    try:
+        name = _read_font_name(path)
+    except Exception:
+        name = None
+    if name is not None:
+        return name
+
+    TTFont = _get_ttfont()
+    if not TTFont:
+        return None
+    # not a plain sfnt (e.g. WOFF) - let fontTools have a go
+    try:
+        # lazy=True: only the 'name' table is decompiled, glyf/cmap/hmtx are never touched;
+        # reading through an mmap lets the OS page in just the bytes fontTools seeks to
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                TTFont(mm, fontNumber=0, lazy=True, ignoreDecompileErrors=True) as tt:
+            if 'name' not in tt.reader.keys():
+                return None
+            # getDebugName picks the English Windows record directly; family first, as ASS matches on it
+            name_table = tt['name']
+            return name_table.getDebugName(1) or name_table.getBestFullName() or None
+    except Exception as e:
+        print(f"[WARN] Could not read font internal name ({e}), using file name")
+    return None
+
+def list_fonts():
+    """Sorted (font_name, font_path) list of installed fonts (cached), or None if unavailable."""
+    return _font_index()[0]
+
+def font_from_file(path):
+    """(font_name_for_ass, path) for a font file, or None if it doesn't exist. No prompts."""
+    if not os.path.isfile(path):
+        return None
+    stat = os.stat(path)
+    name = _font_internal_name(path, (stat.st_mtime, stat.st_size))
+    return name or os.path.splitext(os.path.basename(path))[0], path
+
+def resolve_font(selection, fonts=None):
+    """
+    Map a font selection to a (font_name, font_path) entry of `fonts` (default: list_fonts()),
+    or None if nothing matches. Empty -> first font; a number -> 1-based index; text -> exact name,
+    else the first name containing it, else (with rapidfuzz) the best fuzzy match.
+    No prompts or output, so scripted and batch callers can use it directly.
+    """
+    if fonts is None:
+        fonts, fonts_by_lower = _font_index()
+    else:
+        fonts_by_lower = {name.lower(): (name, path) for name, path in fonts}
+    if not fonts:
+        return None
+    selection = selection.strip()
+    if not selection:
+        return fonts[0]
+    if selection.isdigit():
+        idx = int(selection) - 1
+        return fonts[idx] if 0 <= idx < len(fonts) else None
+    sel_lower = selection.lower()
+    match = fonts_by_lower.get(sel_lower) or next((f for f in fonts if sel_lower in f[0].lower()), None)
+    if not match and fuzz_process is not None:
+        best = fuzz_process.extractOne(selection, [f[0] for f in fonts], scorer=fuzz.WRatio, score_cutoff=60)
+        if best:
+            match = fonts[best[2]]
+    return match
 
 def get_user_font_choice():
     """
-    Ask user if they have a font file or want to choose from installed fonts.
+    Ask user if they have a font file or want to choose from installed fonts
+    (interactive wrapper around font_from_file / list_fonts / resolve_font).
     Returns: tuple (font_name_for_ass, font_file_path or None)
     """
     print("\n[FONT] Font selection")
@@ -27,67 +339,47 @@ def get_user_font_choice():
 
     if choice == 'y':
         path = input("Enter full path to font file (TTF/OTF): ").strip('"')
-        if os.path.isfile(path):
-            if TTFont:
-                try:
-                    tt = TTFont(path, fontNumber=0, ignoreDecompileErrors=True)
-                    name = None
-                    for record in tt['name'].names:
-                        if record.nameID in (1, 4):
-                            try:
-                                name = record.toUnicode()
-                            except Exception:
-                                try:
-                                    name = record.string.decode('utf-8', errors='ignore')
-                                except Exception:
-                                    name = None
-                            if name:
-                                break
-                    font_name_for_ass = name or os.path.splitext(os.path.basename(path))[0]
-                    print(f"[INFO] Using font file: {path} (ASS font name: {font_name_for_ass})")
-                    return font_name_for_ass, path
-                except Exception as e:
-                    print(f"[WARN] Could not read font internal name ({e}), using file name")
-                    return os.path.splitext(os.path.basename(path))[0], path
-            else:
-                print("[WARN] fontTools not available; using file name as font name.")
-                return os.path.splitext(os.path.basename(path))[0], path
-        else:
-            print("[ERROR] Font file not found, will fallback to installed fonts.")
-            choice = 'n'
-
-    if font_manager:
-        fonts = sorted({f.name: f.fname for f in font_manager.fontManager.ttflist}.items())
-        if not fonts:
-            print("[WARN] No installed fonts found, using Arial fallback")
-            return 'Arial', None
-
-        print("\nInstalled fonts (first 50):")
-        for i, (fname, fpath) in enumerate(fonts[:50], start=1):
-            print(f"{i:2d}. {fname}")
-        sel = input("Enter number or font name (or press Enter to use first): ").strip()
-        if not sel:
-            return fonts[0][0], fonts[0][1]
-        if sel.isdigit():
-            idx = int(sel) - 1
-            if 0 <= idx < len(fonts):
-                return fonts[idx][0], fonts[idx][1]
-            else:
-                print("[WARN] Number out of range, using first")
-                return fonts[0][0], fonts[0][1]
-        else:
-            matches = [f for f in fonts if sel.lower() in f[0].lower()]
-            if matches:
-                print(f"[INFO] Using matched font: {matches[0][0]}")
-                return matches[0][0], matches[0][1]
-            else:
-                print("[WARN] No match found, using Arial fallback")
-                return 'Arial', None
-    else:
+        font = font_from_file(path)
+        if font:
+            print(f"[INFO] Using font file: {path} (ASS font name: {font[0]})")
+            return font
+        print("[ERROR] Font file not found, will fallback to installed fonts.")
+
+    fonts = list_fonts()
+    if fonts is None:
         print("[WARN] matplotlib.font_manager not available, using Arial fallback")
         return 'Arial', None
+    if not fonts:
+        print("[WARN] No installed fonts found, using Arial fallback")
+        return 'Arial', None
 
-def create_professional_glow_layers():
+    print("\nInstalled fonts (first 50):")
+    for i, (fname, fpath) in enumerate(fonts[:50], start=1):
+        print(f"{i:2d}. {fname}")
+    sel = input("Enter number or font name (or press Enter to use first): ").strip()
+    match = resolve_font(sel)
+    if sel.isdigit():
+        if not match:
+            print("[WARN] Number out of range, using first")
+            return fonts[0]
+        return match
+    if not sel:
+        return match
+    if match:
+        print(f"[INFO] Using matched font: {match[0]}")
+        return match
+    print("[WARN] No match found, using Arial fallback")
+    return 'Arial', None
+
+# Values for the style's 'glow_mode': the full layered glow, a cheaper single-layer approximation,
+# the full look with the three widest outer glows blurred by ffmpeg at quarter resolution,
+# or a two-layer outer glow (power-of-two radii plus box-blur passes) with the inner glows kept
+GLOW_MODES = ("full", "single", "downscaled", "lite")
+# Internal layer set for the separate "downscaled" glow-pass ASS (see glow_pass_path)
+GLOW_PASS_MODE = "downscaled_pass"
+
+@functools.lru_cache(maxsize=8)
+def create_professional_glow_layers(mode="full"):
     """
     Professional-grade inner and outer glow effects
     Mimics After Effects / Premiere Pro style glows
@@ -106,6 +398,14 @@ def create_professional_glow_layers():
     - Makes text appear luminous from within
     
     CURRENT: Professional studio-quality glow
+
+    mode (style 'glow_mode', see GLOW_MODES): "full" is the stack below; "single" keeps one
+    outer glow at a moderate radius plus the outline, so libass blurs 2 layers per caption instead of 8;
+    "downscaled" drops the three widest outer glows, which GLOW_PASS_MODE returns unblurred for
+    the burner to blur at quarter resolution; "lite" replaces the five outer glows with two
+    (\\blur8 widened by two \\be box-blur passes, and \\blur4), keeping inner glows and outline.
+
+    The layers are built once and cached; callers get a shared tuple and must not mutate it.
     """
     
     layers = []
@@ -194,28 +494,207 @@ def create_professional_glow_layers():
         'type': 'outline'
     })
     
-    return layers
+    if mode == "downscaled":
+        layers = layers[3:]
+    elif mode == GLOW_PASS_MODE:
+        # blur 20/16/12 happens in ffmpeg (downscale -> gblur -> upscale), not in libass
+        layers = [dict(layer, blur=0) for layer in layers[:3]]
+    elif mode == "lite":
+        # "blur the blur": the \be passes on the blur-8 layer stand in for the 12/16/20 radii
+        layers = [
+            dict(layers[0], blur=8, be=2, border=2.5, alpha='&HB0'),
+            dict(layers[4], blur=4),
+        ] + layers[5:]
+    elif mode == "single":
+        # one mid-radius outer glow standing in for the five-layer falloff, then the outline
+        layers = [
+            dict(layers[3], blur=10, border=2, alpha='&HA0', layer=0),
+            dict(layers[-1], layer=1),
+        ]
+
+    # Normalize alpha/color to the trailing-& form once here, so writers can use them as-is
+    for layer in layers:
+        for key in ('alpha', 'color'):
+            if isinstance(layer.get(key), str):
+                layer[key] = _ass_fix(layer[key])
+
+    return tuple(layers)
+
+@functools.lru_cache(maxsize=128)
+def _ass_fix(val):
+    """Make an ASS colour/alpha string robust (ensure trailing & if needed). Inputs come from a small fixed set."""
+    if not isinstance(val, str):
+        return val
+    if val.startswith("&H") and not val.endswith("&"):
+        return val + "&"
+    return val
 
-def write_subtitles_files(captions, style, resolution, temp_dir, base_name="captions"):
+@functools.lru_cache(maxsize=8)
+def _glow_layer_events(primary_color, base_draw_layer=0, glow_mode="full"):
     """
-    Same behavior as your version but fixes:
-      - prevents outline/glow from becoming a solid block during disappearance
-      - ensures exit animation ALWAYS completes before the next caption begins
-    DOES NOT change any timestamps. Only changes event-layer transforms and draw order.
+    Per glow layer: (draw layer, style name, target alpha, blur/border/color overrides).
+    The layers are fixed and already normalized, so this is built once per primary colour.
     """
-    import os
-    width, height = resolution
-
-    srt_path = os.path.join(temp_dir, f"{base_name}.srt")
-    ass_path = os.path.join(temp_dir, f"{base_name}.ass")
+    layer_events = []
+    for i, layer in enumerate(create_professional_glow_layers(glow_mode)):
+        # Layer-specific target alpha during visible time (if not provided, use a reasonable default)
+        layer_alpha_target = layer.get('alpha', None)
+        if not layer_alpha_target:
+            # use mid alpha defaults depending on type
+            if layer.get('type') == 'inner_glow':
+                layer_alpha_target = "&H20&"   # bright inner
+            elif layer.get('type') == 'outline':
+                layer_alpha_target = "&H60&"   # semi-opaque outline (safe)
+            else:
+                layer_alpha_target = "&H80&"   # soft outer default
+
+        # Per-layer visual overrides (blur, border, color) but NO static alpha
+        overrides = ""
+        if 'blur' in layer and layer['blur']:
+            overrides += f"\\blur{layer['blur']}"
+        if layer.get('be'):
+            overrides += f"\\be{layer['be']}"
+        # use exact border value (negative allowed)
+        overrides += f"\\bord{layer.get('border', 0)}"
+        # layer colours already carry the trailing &; only the primary-colour fallback needs fixing
+        col = layer['color'] if 'color' in layer else _ass_fix(primary_color)
+        if col:
+            overrides += f"\\c{col}\\3c{col}"
+        layer_events.append((base_draw_layer + i, f"GlowLayer{i}", layer_alpha_target, overrides))
+    return tuple(layer_events)
+
+@functools.lru_cache(maxsize=32)
+def _render_style_block(font_name, font_size, primary_color, outline_color, back_color,
+                        outline, shadow, align, margin_v, glow_mode):
+    """The whole [V4+ Styles] section (glow layer styles + Default), rendered once per style."""
+    lines = [
+        "[V4+ Styles]\n",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding\n",
+    ]
+    # Create styles for glow layers (keeps outline column as absolute border; blur will be per-event)
+    if glow_mode:
+        for i, layer in enumerate(create_professional_glow_layers(glow_mode)):
+            style_name = f"GlowLayer{i}"
+            border_val = abs(layer.get('border', 0))
+            color = layer.get('color', '&HFFFFFF')
+            lines.append(f"Style: {style_name},{font_name},{font_size},{color},{color},{color},{back_color},0,0,0,0,100,100,0,0,1,{border_val},0,{align},0,0,{margin_v},0\n")
+
+    # Default/main style (unchanged)
+    lines.append(f"Style: Default,{font_name},{font_size},{primary_color},{primary_color},{outline_color},{back_color},0,0,0,0,100,100,0,0,1,{outline},{shadow},{align},0,0,{margin_v},0\n\n")
+    return "".join(lines)
+
+def _animation_windows_py(starts, ends, fast_ms, preempt_ms):
+    """Pure-Python reference for _animation_windows (used when NumPy is not installed)."""
+    n = len(starts)
+    entry_ends, exit_starts, exit_ends = [], [], []
+    for idx, (start, end) in enumerate(zip(starts, ends)):
+        duration_ms = max(1, int((end - start) * 1000))
+        use_fast_ms = min(fast_ms, max(1, duration_ms // 2))
+
+        # default exit window (finishes preempt_ms before line end)
+        exit_end_rel = max(0, duration_ms - preempt_ms)
+        exit_start_rel = max(0, exit_end_rel - use_fast_ms)
+
+        # entry window
+        entry_end_rel = min(use_fast_ms, max(1, duration_ms - use_fast_ms - preempt_ms))
+        if entry_end_rel < 1:
+            entry_end_rel = min(use_fast_ms, duration_ms // 3)
+            exit_end_rel = max(entry_end_rel + 1, exit_end_rel)
+            exit_start_rel = max(entry_end_rel + 1, exit_end_rel - use_fast_ms)
+
+        # --- NEW: clamp exit so it finishes before the next caption starts (very important for smoothness)
+        # Compute next caption's relative start (ms from this caption's start)
+        if idx + 1 < n:
+            next_rel = int(round((starts[idx + 1] - start) * 1000))
+            # allowed exit end must be strictly less than next_rel - SAFETY_MARGIN_MS
+            allowed_exit_end = min(exit_end_rel, next_rel - SAFETY_MARGIN_MS)
+            allowed_exit_end = max(0, allowed_exit_end)
+
+            # recompute exit window around allowed_exit_end
+            exit_end_rel = allowed_exit_end
+            exit_start_rel = max(0, exit_end_rel - use_fast_ms)
 
-    # small helper to make ASS color/alpha robust (ensure trailing & if needed)
-    def _ass_fix(val):
-        if not isinstance(val, str):
-            return val
-        if val.startswith("&H") and not val.endswith("&"):
-            return val + "&"
-        return val
+            # ensure entry_end < exit_start (if not, shrink entry_end_rel)
+            if entry_end_rel >= exit_start_rel:
+                # attempt to shrink entry_end_rel to sit before exit_start_rel
+                new_entry_end = max(1, exit_start_rel - 1)
+                # If we cannot keep 1 ms entry (extremely tight), we fallback to 1 and let exit_start_rel be at least +1
+                entry_end_rel = min(entry_end_rel, new_entry_end)
+                if entry_end_rel < 1:
+                    entry_end_rel = 1
+                    exit_start_rel = max(entry_end_rel + 1, exit_start_rel)
+                    exit_end_rel = max(exit_start_rel + 1, exit_end_rel)
+
+        entry_ends.append(entry_end_rel)
+        exit_starts.append(exit_start_rel)
+        exit_ends.append(exit_end_rel)
+    return entry_ends, exit_starts, exit_ends
+
+def _animation_windows(starts, ends, fast_ms, preempt_ms):
+    """
+    Entry-end / exit-start / exit-end (ms from each caption's start; entry always starts at 0)
+    for every caption, as lists of ints. Same rules as the per-caption loop they replace:
+    entry and exit take fast_ms (at most half the caption), exit finishes preempt_ms before the
+    caption ends and SAFETY_MARGIN_MS before the next caption starts, and entry ends before exit starts.
+    """
+    if np is None:
+        return _animation_windows_py(starts, ends, fast_ms, preempt_ms)
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    if starts.size == 0:
+        return [], [], []
+
+    duration = np.maximum(1, np.trunc((ends - starts) * 1000).astype(np.int64))
+    use_fast = np.minimum(fast_ms, np.maximum(1, duration // 2))
+
+    # default exit window (finishes preempt_ms before line end)
+    exit_end = np.maximum(0, duration - preempt_ms)
+    exit_start = np.maximum(0, exit_end - use_fast)
+
+    # entry window
+    entry_end = np.minimum(use_fast, np.maximum(1, duration - use_fast - preempt_ms))
+    tight = entry_end < 1
+    entry_end = np.where(tight, np.minimum(use_fast, duration // 3), entry_end)
+    exit_end = np.where(tight, np.maximum(entry_end + 1, exit_end), exit_end)
+    exit_start = np.where(tight, np.maximum(entry_end + 1, exit_end - use_fast), exit_start)
+
+    # clamp exit so it finishes before the next caption starts (the last caption keeps its defaults)
+    has_next = np.zeros(starts.size, dtype=bool)
+    has_next[:-1] = True
+    next_rel = np.zeros(starts.size, dtype=np.int64)
+    next_rel[:-1] = np.rint((starts[1:] - starts[:-1]) * 1000).astype(np.int64)
+    clamped_end = np.maximum(0, np.minimum(exit_end, next_rel - SAFETY_MARGIN_MS))
+    exit_end = np.where(has_next, clamped_end, exit_end)
+    exit_start = np.where(has_next, np.maximum(0, exit_end - use_fast), exit_start)
+
+    # ensure entry_end < exit_start (if not, shrink entry_end)
+    overlap = has_next & (entry_end >= exit_start)
+    entry_end = np.where(overlap, np.minimum(entry_end, np.maximum(1, exit_start - 1)), entry_end)
+    floor = overlap & (entry_end < 1)
+    entry_end = np.where(floor, 1, entry_end)
+    exit_start = np.where(floor, np.maximum(2, exit_start), exit_start)
+    exit_end = np.where(floor, np.maximum(exit_start + 1, exit_end), exit_end)
+
+    return entry_end.tolist(), exit_start.tolist(), exit_end.tolist()
+
+def _build_srt(captions, cap_starts, cap_ends):
+    """SRT document for captions (cap_starts/cap_ends: their start/end seconds) as one string."""
+    srt_starts, srt_ends = format_times_srt_batch(cap_starts), format_times_srt_batch(cap_ends)
+    # one f-string per caption (not four small writes), joined once; this measured faster than
+    # writelines() over the pieces or a str.format template mapped over the columns
+    return "".join([
+        f"{i}\n{start} --> {end}\n{c['text_srt']}\n\n"
+        for i, (start, end, c) in enumerate(zip(srt_starts, srt_ends, captions), start=1)
+    ])
+
+def _build_ass(captions, style, resolution, cap_starts, cap_ends, glow_pass=False):
+    """
+    ASS document for captions as one string; no file I/O (write_subtitles_files does that).
+    Every caption-independent piece (style block, layer overrides, the Dialogue template)
+    is resolved once from style/resolution, then filled in per caption.
+    glow_pass=True renders only the unblurred wide glow layers of the "downscaled" glow mode.
+    """
+    width, height = resolution
 
     # Base style settings
     primary_color = normalize_hex_color_to_ass(style.get('font_color', '#FFFFFF'))
@@ -264,159 +743,129 @@ def write_subtitles_files(captions, style, resolution, temp_dir, base_name="capt
 
     # Glow layers (use your professional layer generator)
     glow_enabled = bool(style.get('glow', True))
-    glow_layers = create_professional_glow_layers() if glow_enabled else []
-
-    # Ensure layer alpha/color strings have trailing &
-    for layer in glow_layers:
-        if 'alpha' in layer and isinstance(layer['alpha'], str):
-            layer['alpha'] = _ass_fix(layer['alpha'])
-        if 'color' in layer and isinstance(layer['color'], str):
-            layer['color'] = _ass_fix(layer['color'])
-
-    # --- Write SRT (unchanged) ---
-    with open(srt_path, "w", encoding="utf-8") as srt:
-        for i, c in enumerate(captions, start=1):
-            srt.write(f"{i}\n")
-            srt.write(f"{format_time_srt(c['start'])} --> {format_time_srt(c['end'])}\n")
-            srt.write(c['text_srt'] + "\n\n")
-
-    # --- Write ASS ---
-    with open(ass_path, "w", encoding="utf-8") as ass:
-        ass.write("[Script Info]\nScriptType: v4.00+\n")
-        ass.write(f"PlayResX: {width}\nPlayResY: {height}\nScaledBorderAndShadow: yes\n\n")
-
-        ass.write("[V4+ Styles]\n")
-        ass.write("Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding\n")
-
-        # Create styles for glow layers (keeps outline column as absolute border; blur will be per-event)
-        if glow_enabled:
-            for i, layer in enumerate(glow_layers):
-                style_name = f"GlowLayer{i}"
-                border_val = abs(layer.get('border', 0))
-                ass.write(f"Style: {style_name},{font_name},{font_size},{layer.get('color','&HFFFFFF')},{layer.get('color','&HFFFFFF')},{layer.get('color','&HFFFFFF')},{back_color},0,0,0,0,100,100,0,0,1,{border_val},0,{align},0,0,{margin_v},0\n")
-
-        # Default/main style (unchanged)
-        ass.write(f"Style: Default,{font_name},{font_size},{primary_color},{primary_color},{outline_color},{back_color},0,0,0,0,100,100,0,0,1,{outline},{shadow},{align},0,0,{margin_v},0\n\n")
-
-        ass.write("[Events]\n")
-        ass.write("Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n")
-
-        # Draw order control:
-        # - glow layers start at base_draw_layer (0..N-1)
-        # - soft shadow at shadow_layer_index
-        # - main text on top at main_layer_index
-        base_draw_layer = 0
-        glow_count = len(glow_layers)
-        shadow_layer_index = base_draw_layer + glow_count
-        main_layer_index = shadow_layer_index + 1
-
-        # Iterate captions and write events
-        for idx, c in enumerate(captions):
-            start_time = format_time_ass(c['start'])
-            end_time = format_time_ass(c['end'])
-            text = c['text_ass']
-
-            duration_ms = max(1, int((c['end'] - c['start']) * 1000))
-            use_fast_ms = min(fast_ms, max(1, duration_ms // 2))
-
-            # default exit window (finishes preempt_ms before line end)
-            exit_end_rel = max(0, duration_ms - preempt_ms)
-            exit_start_rel = max(0, exit_end_rel - use_fast_ms)
+    glow_mode = style.get('glow_mode') or 'full'
+    if glow_mode not in GLOW_MODES:
+        print(f"[WARN] Unknown glow_mode '{glow_mode}', using 'full'.")
+        glow_mode = 'full'
+    if glow_pass:
+        glow_enabled, glow_mode = True, GLOW_PASS_MODE
+    # Alpha/color strings already carry the trailing & (normalized when the layers are built)
+    glow_layers = create_professional_glow_layers(glow_mode) if glow_enabled else ()
+
+    ass_starts, ass_ends = format_times_ass_batch(cap_starts), format_times_ass_batch(cap_ends)
+
+    ass_chunks = []
+    add = ass_chunks.append
+    add("[Script Info]\nScriptType: v4.00+\n")
+    add(f"PlayResX: {width}\nPlayResY: {height}\nScaledBorderAndShadow: yes\n\n")
+
+    add(_render_style_block(font_name, font_size, primary_color, outline_color, back_color,
+                            outline, shadow, align, margin_v, glow_mode if glow_enabled else None))
+
+    add("[Events]\n")
+    add("Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n")
+
+    # Draw order control:
+    # - glow layers start at base_draw_layer (0..N-1)
+    # - soft shadow at shadow_layer_index
+    # - main text on top at main_layer_index
+    base_draw_layer = 0
+    glow_count = len(glow_layers)
+    shadow_layer_index = base_draw_layer + glow_count
+    main_layer_index = shadow_layer_index + 1
+
+    # Everything below that doesn't depend on the caption is built once, outside the loop.
+    # start: scaled small and fully transparent
+    start_state = f"\\fscx{entry_start_pct}\\fscy{entry_start_pct}\\alpha&HFF&"
+    exit_state = f"\\fscx{exit_end_scale_pct}\\fscy{exit_end_scale_pct}\\alpha&HFF&"
+
+    layer_events = _glow_layer_events(primary_color, base_draw_layer, glow_mode) if glow_enabled else ()
+
+    if glow_enabled and glow_layers:
+        # Soft black drop shadow underneath main text but above far-out glows
+        shad_px = max(1, int(round(shadow * 2)))
+        # choose a reasonable blur for the shadow (from the widest glow, even when ffmpeg draws it)
+        widest = create_professional_glow_layers('full' if glow_mode == 'downscaled' else glow_mode)[0]
+        shadow_blur = max(1.0, float(widest.get('blur', 4)) / 3.0)
+        shadow_overrides = f"\\blur{shadow_blur}\\c&H000000&\\3c&H000000&\\shad{shad_px}"
+
+    # All Dialogue lines of one caption as a single str.format template with every layer-invariant
+    # field baked in; per caption only {0} start, {1} end, {2} entry transform prefix,
+    # {3} exit transform and {4} text are filled in (ASS override braces are doubled)
+    event_lines = []
+    if glow_enabled and glow_layers:
+        for draw_layer, style_name, layer_alpha_target, overrides in layer_events:
+            event_lines.append("Dialogue: %d,{0},{1},%s,,0,0,0,,{{%s{2}%s){3}%s}}{4}\n"
+                               % (draw_layer, style_name, start_state, layer_alpha_target, overrides))
+    if glow_enabled and glow_layers and not glow_pass:
+        # make shadow animate with same transforms (fade in->visible at semi, fade out->transparent)
+        event_lines.append("Dialogue: %d,{0},{1},Default,,0,0,0,,{{%s{2}&H80&){3}%s}}{4}\n"
+                           % (shadow_layer_index, start_state, shadow_overrides))
+    if not glow_pass:
+        # MAIN text: animate to fully-opaque main alpha (&H00&) and then to transparent on exit
+        event_lines.append("Dialogue: %d,{0},{1},Default,,0,0,0,,{{%s{2}&H00&){3}}}{4}\n"
+                           % (main_layer_index, start_state))
+    event_template = "".join(event_lines)
+
+    # Entry/exit animation windows (ms, relative to each caption's start) for all captions at once
+    entry_ends, exit_starts, exit_ends = _animation_windows(cap_starts, cap_ends, fast_ms, preempt_ms)
+
+    # Transforms shared by every layer of a caption (entry -> layer's target alpha; exit -> transparent)
+    # as %-templates with accel/exit state baked in; per caption only the window times go in
+    entry_start_rel = 0
+    entry_fmt = "\\t(%s,%%s,%s,\\fscx100\\fscy100\\alpha" % (entry_start_rel, accel)
+    exit_fmt = "\\t(%%s,%%s,%s,%s)" % (accel, exit_state)
+
+    # All events in one comprehension: one template fill per caption, nothing looked up by index
+    fill = event_template.format
+    ass_chunks += [
+        fill(start_time, end_time, entry_fmt % entry_end_rel,
+             exit_fmt % (exit_start_rel, exit_end_rel), c['text_ass'])
+        for start_time, end_time, c, entry_end_rel, exit_start_rel, exit_end_rel in zip(
+            ass_starts, ass_ends, captions, entry_ends, exit_starts, exit_ends)
+    ]
+
+    return "".join(ass_chunks)
+
+def glow_pass_path(ass_path):
+    """Where write_subtitles_files puts the glow-pass ASS of the "downscaled" glow mode."""
+    return os.path.splitext(ass_path)[0] + "_glow.ass"
+
+def write_subtitles_files(captions, style, resolution, temp_dir, base_name="captions", write_srt=True, write_ass=True):
+    """
+    Same behavior as your version but fixes:
+      - prevents outline/glow from becoming a solid block during disappearance
+      - ensures exit animation ALWAYS completes before the next caption begins
+    DOES NOT change any timestamps. Only changes event-layer transforms and draw order.
+    With write_srt=False only the ASS is written and the returned srt_path is None;
+    with write_ass=False (soft subtitles) only the SRT is written and ass_path is None.
+    glow_mode "downscaled" also writes the glow-pass ASS at glow_pass_path(ass_path).
+    """
+    srt_path = os.path.join(temp_dir, f"{base_name}.srt")
+    ass_path = os.path.join(temp_dir, f"{base_name}.ass")
+
+    cap_starts = [c['start'] for c in captions]
+    cap_ends = [c['end'] for c in captions]
+
+    # Both files are assembled in memory and written with a single write() each
+    if write_srt:
+        with open(srt_path, "w", encoding="utf-8", newline="\n") as srt:
+            srt.write(_build_srt(captions, cap_starts, cap_ends))
+    else:
+        srt_path = None
+
+    if not write_ass:
+        print("[INFO] SRT written (soft subtitles; no ASS styling).")
+        return srt_path, None
+
+    ass_text = _build_ass(captions, style, resolution, cap_starts, cap_ends)
+    with open(ass_path, "w", encoding="utf-8", newline="\n") as ass:
+        ass.write(ass_text)
 
-            # entry window
-            entry_start_rel = 0
-            entry_end_rel = min(use_fast_ms, max(1, duration_ms - use_fast_ms - preempt_ms))
-            if entry_end_rel < 1:
-                entry_end_rel = min(use_fast_ms, duration_ms // 3)
-                exit_end_rel = max(entry_end_rel + 1, exit_end_rel)
-                exit_start_rel = max(entry_end_rel + 1, exit_end_rel - use_fast_ms)
-
-            # --- NEW: clamp exit so it finishes before the next caption starts (very important for smoothness)
-            # Compute next caption's relative start (ms from this caption's start)
-            if idx + 1 < len(captions):
-                next_rel = int(round((captions[idx + 1]['start'] - c['start']) * 1000))
-                # safety margin (ms) to avoid equal boundaries causing visible overlap; small value
-                SAFETY_MARGIN_MS = 8
-                # allowed exit end must be strictly less than next_rel - SAFETY_MARGIN_MS
-                allowed_exit_end = min(exit_end_rel, next_rel - SAFETY_MARGIN_MS)
-                allowed_exit_end = max(0, allowed_exit_end)
-
-                # recompute exit window around allowed_exit_end
-                exit_end_rel = allowed_exit_end
-                exit_start_rel = max(0, exit_end_rel - use_fast_ms)
-
-                # ensure entry_end < exit_start (if not, shrink entry_end_rel)
-                if entry_end_rel >= exit_start_rel:
-                    # attempt to shrink entry_end_rel to sit before exit_start_rel
-                    new_entry_end = max(1, exit_start_rel - 1)
-                    # If we cannot keep 1 ms entry (extremely tight), we fallback to 1 and let exit_start_rel be at least +1
-                    entry_end_rel = min(entry_end_rel, new_entry_end)
-                    if entry_end_rel < 1:
-                        entry_end_rel = 1
-                        exit_start_rel = max(entry_end_rel + 1, exit_start_rel)
-                        exit_end_rel = max(exit_start_rel + 1, exit_end_rel)
-
-            # If there is no next caption, exit windows stay as default (finish before event end by preempt_ms)
-
-            # Build per-layer animation tags so every layer uses its own target alpha (no static alpha overrides)
-            # start: scaled small and fully transparent
-            start_state = f"\\fscx{entry_start_pct}\\fscy{entry_start_pct}\\alpha&HFF&"
-
-            # For each glow layer, we'll build a per-layer entry transform target alpha (from layer['alpha'])
-            if glow_enabled and glow_layers:
-                for i, layer in enumerate(glow_layers):
-                    draw_layer = base_draw_layer + i
-                    style_name = f"GlowLayer{i}"
-
-                    # Layer-specific target alpha during visible time (if not provided, use a reasonable default)
-                    layer_alpha_target = layer.get('alpha', None)
-                    if not layer_alpha_target:
-                        # use mid alpha defaults depending on type
-                        if layer.get('type') == 'inner_glow':
-                            layer_alpha_target = "&H20&"   # bright inner
-                        elif layer.get('type') == 'outline':
-                            layer_alpha_target = "&H60&"   # semi-opaque outline (safe)
-                        else:
-                            layer_alpha_target = "&H80&"   # soft outer default
-                    else:
-                        layer_alpha_target = _ass_fix(layer_alpha_target)
-
-                    # Compose per-layer transforms (entry -> target alpha; exit -> transparent)
-                    entry_t_layer = f"\\t({entry_start_rel},{entry_end_rel},{accel},\\fscx100\\fscy100\\alpha{layer_alpha_target})"
-                    exit_t_layer  = f"\\t({exit_start_rel},{exit_end_rel},{accel},\\fscx{exit_end_scale_pct}\\fscy{exit_end_scale_pct}\\alpha&HFF&)"
-                    # Per-layer visual overrides (blur, border, color) but NO static alpha
-                    overrides = ""
-                    if 'blur' in layer and layer['blur']:
-                        overrides += f"\\blur{layer['blur']}"
-                    # use exact border value (negative allowed)
-                    overrides += f"\\bord{layer.get('border', 0)}"
-                    # color override if present
-                    col = layer.get('color', primary_color)
-                    if col:
-                        col_str = col if isinstance(col, str) and col.endswith('&') else _ass_fix(col)
-                        overrides += f"\\c{col_str}\\3c{col_str}"
-
-                    full_tags = "{" + start_state + entry_t_layer + exit_t_layer + overrides + "}"
-                    ass.write(f"Dialogue: {draw_layer},{start_time},{end_time},{style_name},,0,0,0,,{full_tags}{text}\n")
-
-                # Soft black drop shadow underneath main text but above far-out glows
-                shad_px = max(1, int(round(shadow * 2)))
-                # choose a reasonable blur for the shadow
-                shadow_blur = max(1.0, float(glow_layers[0].get('blur', 4)) / 3.0)
-                # make shadow animate with same transforms (fade in->visible at semi, fade out->transparent)
-                shadow_entry_alpha = "&H80&"
-                shadow_entry = f"\\t({entry_start_rel},{entry_end_rel},{accel},\\fscx100\\fscy100\\alpha{shadow_entry_alpha})"
-                shadow_exit  = f"\\t({exit_start_rel},{exit_end_rel},{accel},\\fscx{exit_end_scale_pct}\\fscy{exit_end_scale_pct}\\alpha&HFF&)"
-                shadow_overrides = f"\\blur{shadow_blur}\\c&H000000&\\3c&H000000&\\shad{shad_px}"
-                shadow_tags = "{" + start_state + shadow_entry + shadow_exit + shadow_overrides + "}"
-                ass.write(f"Dialogue: {shadow_layer_index},{start_time},{end_time},Default,,0,0,0,,{shadow_tags}{text}\n")
-
-            # MAIN text: build transforms that animate to fully-opaque main alpha (&H00&) and then to transparent on exit
-            entry_t_main = f"\\t({entry_start_rel},{entry_end_rel},{accel},\\fscx100\\fscy100\\alpha&H00&)"
-            exit_t_main  = f"\\t({exit_start_rel},{exit_end_rel},{accel},\\fscx{exit_end_scale_pct}\\fscy{exit_end_scale_pct}\\alpha&HFF&)"
-            main_full_tags = "{" + start_state + entry_t_main + exit_t_main + "}"
-            ass.write(f"Dialogue: {main_layer_index},{start_time},{end_time},Default,,0,0,0,,{main_full_tags}{text}\n")
+    if style.get('glow', True) and style.get('glow_mode') == 'downscaled':
+        with open(glow_pass_path(ass_path), "w", encoding="utf-8", newline="\n") as glow:
+            glow.write(_build_ass(captions, style, resolution, cap_starts, cap_ends, glow_pass=True))
 
     print("[INFO] ASS written with stroke, shadow, and multi-layer glow (fixed draw order and exit-clamp).")
-    print("[INFO] Outline thickness:", outline, "| Shadow depth:", shadow)
+    print("[INFO] Outline thickness:", int(style.get('outline', 2)), "| Shadow depth:", float(style.get('shadow', 0.5)))
     return srt_path, ass_path
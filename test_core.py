@@ -0,0 +1,140 @@
+# project/test_core.py
+import os
+import random
+import struct
+
+import pytest
+
+import caption_builder
+import subtitle
+from burner import _escape_filter_path
+from helpers import _mp4_resolution
+
+WORDS = ['hi', 'there.', 'what?', 'ok!', 'go', 'yes', 'no.', 'x']
+
+
+def _random_words(rng):
+    words, starts, ends = [], [], []
+    t = rng.random()
+    for _ in range(rng.randint(0, 60)):
+        t += rng.choice([0, 0.05, 0.1, 0.25, 0.3, 0.7, 1.2, -0.01])
+        d = rng.random() * 0.5
+        words.append(rng.choice(WORDS))
+        starts.append(t)
+        ends.append(t + d)
+        t += d
+    return words, starts, ends
+
+
+# ---------------- caption grouping ----------------
+
+@pytest.mark.skipif(caption_builder.np is None, reason="NumPy not installed")
+def test_vectorized_grouping_matches_reference():
+    rng = random.Random(1)
+    for _ in range(2000):
+        words, starts, ends = _random_words(rng)
+        args = (
+            words, starts, ends,
+            rng.choice([1, 2, 4, 10]),        # limit
+            rng.choice([0.0, 0.2, 0.6]),      # cont_th
+            rng.choice([0.2, 0.6, 1.0]),      # sep_th
+            rng.choice([True, False]),        # sentence_breaks
+        )
+        assert caption_builder._captions_from_arrays(*args) == caption_builder._group_words(*args)
+
+
+# ---------------- animation windows ----------------
+
+@pytest.mark.skipif(subtitle.np is None, reason="NumPy not installed")
+def test_animation_windows_match_reference():
+    rng = random.Random(2)
+    for _ in range(2000):
+        starts, ends = [], []
+        t = 0.0
+        for _ in range(rng.randint(0, 40)):
+            t += rng.choice([0, 0.005, 0.1, rng.random() * 3])
+            d = rng.choice([0.001, 0.01, rng.random() * 4])
+            starts.append(round(t, rng.choice([2, 3, 6])))
+            ends.append(t + d)
+            t += d
+        fast_ms = rng.choice([50, 120, 300])
+        preempt_ms = rng.choice([0, 40, 100])
+        assert (subtitle._animation_windows(starts, ends, fast_ms, preempt_ms)
+                == subtitle._animation_windows_py(starts, ends, fast_ms, preempt_ms))
+
+
+# ---------------- filter path escaping ----------------
+
+def _av_get_token(text, terminators):
+    """Python model of ffmpeg's av_get_token: backslash escapes one char, '...' quotes a run."""
+    out = []
+    i = 0
+    while i < len(text) and text[i] not in terminators:
+        c = text[i]
+        if c == '\\' and i + 1 < len(text):
+            out.append(text[i + 1])
+            i += 2
+        elif c == "'":
+            end = text.find("'", i + 1)
+            end = len(text) if end < 0 else end
+            out.append(text[i + 1:end])
+            i = end + 1
+        else:
+            out.append(c)
+            i += 1
+    return ''.join(out), text[i:]
+
+
+@pytest.mark.parametrize("name", [
+    "plain.ass",
+    "drive:colon.ass",
+    "it's.ass",
+    "a,b;c.ass",
+    "[bracketed].ass",
+    "all: of 'them', [here].ass",
+    "back\\slash.ass",
+])
+def test_escape_filter_path_round_trips(tmp_path, name):
+    path = os.path.join(str(tmp_path), name)
+    escaped = _escape_filter_path(path)
+    # the filtergraph parser reads the filter arguments up to [ ] , ;
+    args, rest = _av_get_token(escaped, "[],;")
+    assert rest == ""
+    # then the option parser reads one value up to the next ':'
+    value, rest = _av_get_token(args, ":")
+    assert rest == ""
+    assert value == os.path.abspath(path)
+
+
+# ---------------- MP4 header parsing ----------------
+
+def _box(box_type, payload=b""):
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def _trak(handler, width, height):
+    tkhd = _box(b'tkhd', bytes(76) + struct.pack('>II', width << 16, height << 16))
+    hdlr = _box(b'hdlr', bytes(8) + handler + bytes(12) + b'\0')
+    # visual sample entry: reserved + data_ref_index, pre_defined/reserved, then width/height
+    entry = _box(b'avc1', bytes(8) + bytes(16) + struct.pack('>HH', width, height) + bytes(50))
+    stsd = _box(b'stsd', struct.pack('>II', 0, 1) + entry)
+    stbl = _box(b'stbl', stsd)
+    minf = _box(b'minf', stbl)
+    mdia = _box(b'mdia', _box(b'mdhd', bytes(24)) + hdlr + minf)
+    return _box(b'trak', tkhd + mdia)
+
+
+def test_mp4_resolution_reads_video_track(tmp_path):
+    moov = _box(b'moov', _box(b'mvhd', bytes(100)) + _trak(b'soun', 7, 9) + _trak(b'vide', 1080, 1920))
+    path = tmp_path / "clip.mp4"
+    # mdat before moov, as in files that weren't written with +faststart
+    path.write_bytes(_box(b'ftyp', b'isom' + bytes(4)) + _box(b'mdat', bytes(4096)) + moov)
+    assert _mp4_resolution(str(path)) == (1080, 1920)
+
+
+def test_mp4_resolution_without_video_track(tmp_path):
+    path = tmp_path / "audio.m4a"
+    path.write_bytes(_box(b'ftyp', b'M4A ' + bytes(4)) + _box(b'moov', _trak(b'soun', 7, 9)))
+    assert _mp4_resolution(str(path)) is None
+    path.write_bytes(_box(b'ftyp', b'isom' + bytes(4)) + _box(b'mdat', bytes(64)))
+    assert _mp4_resolution(str(path)) is None
@@ -1,21 +1,215 @@
 # project/transcription.py
 import os
-import json
-try:
+import hashlib
+import functools
+import pydoc
+import shutil
+import importlib.util
+
+# faster-whisper (CTranslate2, quantized kernels) is preferred; openai-whisper is the fallback.
+# Only their presence is checked here - the heavy imports (torch, CUDA libs) happen at first use.
+HAVE_FASTER_WHISPER = importlib.util.find_spec("faster_whisper") is not None
+HAVE_WHISPER = importlib.util.find_spec("whisper") is not None
+
+if not HAVE_FASTER_WHISPER and not HAVE_WHISPER:
+    print("[ERROR] whisper is required. Install with: pip install -U faster-whisper (or openai-whisper)")
+    raise ImportError("neither faster-whisper nor openai-whisper is installed")
+
+from helpers import format_times_srt_batch, read_json, write_json
+
+# Whisper results keyed by video content + model size, so re-styling a video skips transcription
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "videocap")
+FINGERPRINT_CHUNK = 1 << 20
+
+@functools.lru_cache(maxsize=1)
+def _get_faster_whisper():
+    """Import faster-whisper once; returns (WhisperModel, BatchedInferencePipeline or None, ctranslate2)."""
+    import ctranslate2
+    from faster_whisper import WhisperModel
+    try:
+        from faster_whisper import BatchedInferencePipeline  # faster-whisper >= 1.1
+    except ImportError:
+        BatchedInferencePipeline = None
+    return WhisperModel, BatchedInferencePipeline, ctranslate2
+
+@functools.lru_cache(maxsize=1)
+def _get_whisper():
+    """Import openai-whisper (and torch) once, on first use."""
     import whisper
-except Exception as e:
-    print("[ERROR] whisper is required. Install with: pip install -U openai-whisper")
-    raise
+    return whisper
 
-from helpers import format_time_srt
+def _faster_whisper_device():
+    """Pick (device, compute_type): int8_float16 on tensor-core GPUs, int8 otherwise."""
+    ctranslate2 = _get_faster_whisper()[2]
+    try:
+        if ctranslate2.get_cuda_device_count() > 0:
+            if "int8_float16" in ctranslate2.get_supported_compute_types("cuda"):
+                return "cuda", "int8_float16"
+            return "cuda", "float16"
+    except Exception:
+        pass
+    return "cpu", "int8"
 
-def transcribe_video(video_path, temp_dir, model_size="medium"):
+def _batch_size(device):
+    """Batch size for BatchedInferencePipeline, scaled with GPU memory when torch can report it."""
+    if device != "cuda":
+        return 8
+    try:
+        import torch
+        total_gb = torch.cuda.get_device_properties(0).total_memory / 1024 ** 3
+    except Exception:
+        return 16
+    if total_gb >= 24:
+        return 32
+    if total_gb >= 12:
+        return 16
+    return 8
+
+def _segments_to_dict(segments, info):
+    """Materialize faster-whisper's segment generator into openai-whisper's dict schema."""
+    res_segments = []
+    for seg in segments:
+        res_segments.append({
+            'id': seg.id,
+            'start': seg.start,
+            'end': seg.end,
+            'text': seg.text,
+            'words': [
+                {'word': w.word, 'start': w.start, 'end': w.end, 'probability': w.probability}
+                for w in (seg.words or [])
+            ]
+        })
+    return {
+        'text': ''.join(seg['text'] for seg in res_segments),
+        'segments': res_segments,
+        'language': info.language
+    }
+
+# Loaded models are kept per process, so later videos in a session (or a batch worker) skip
+# re-reading the weights. One model at a time: asking for another size drops the previous one.
+@functools.lru_cache(maxsize=1)
+def _load_faster_whisper_model(model_size):
+    """(WhisperModel, device, compute_type) for model_size, loaded once per process."""
+    WhisperModel = _get_faster_whisper()[0]
+    device, compute_type = _faster_whisper_device()
+    return WhisperModel(model_size, device=device, compute_type=compute_type), device, compute_type
+
+@functools.lru_cache(maxsize=1)
+def _load_whisper_model(model_size):
+    """openai-whisper model for model_size, loaded once per process (on the GPU when CUDA is usable)."""
+    import torch  # already imported by whisper
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    return _get_whisper().load_model(model_size, device=device)
+
+def clear_model_cache():
+    """Drop the cached Whisper models (frees their RAM/GPU memory once nothing else holds them)."""
+    _load_faster_whisper_model.cache_clear()
+    _load_whisper_model.cache_clear()
+
+def _transcribe_faster_whisper(video_path, model_size):
+    BatchedInferencePipeline = _get_faster_whisper()[1]
+    model, device, compute_type = _load_faster_whisper_model(model_size)
+    print(f"[INFO] Using faster-whisper on {device} ({compute_type}).")
+
+    # Batched pipeline: VAD-chunks the audio and pushes many 30 s windows through at once
+    if BatchedInferencePipeline is not None:
+        batch_size = _batch_size(device)
+        try:
+            pipeline = BatchedInferencePipeline(model=model)
+            segments, info = pipeline.transcribe(video_path, batch_size=batch_size, word_timestamps=True)
+            return _segments_to_dict(segments, info)
+        except RuntimeError as e:
+            if "out of memory" not in str(e).lower():
+                raise
+            print(f"[WARN] Batched transcription (batch_size={batch_size}) ran out of GPU memory; retrying unbatched.")
+
+    segments, info = model.transcribe(video_path, word_timestamps=True, vad_filter=True, beam_size=5)
+    return _segments_to_dict(segments, info)
+
+def _run_whisper(video_path, model_size):
     print(f"[INFO] Transcribing {video_path} with model='{model_size}' (word-level timestamps)...")
-    model = whisper.load_model(model_size)
-    res = model.transcribe(video_path, word_timestamps=True)
+    if HAVE_FASTER_WHISPER:
+        res = _transcribe_faster_whisper(video_path, model_size)
+    else:
+        whisper = _get_whisper()
+        model = _load_whisper_model(model_size)
+        audio = video_path
+        on_gpu = model.device.type == "cuda"
+        if on_gpu:
+            # A tensor already on the GPU makes whisper run the STFT + mel filterbank there too
+            import torch
+            audio = torch.from_numpy(whisper.load_audio(video_path)).to(model.device)
+        # fp16 only on CUDA; on CPU whisper would warn and fall back to fp32 anyway
+        print(f"[INFO] Using openai-whisper on {model.device.type} ({'fp16' if on_gpu else 'fp32'}).")
+        res = model.transcribe(audio, word_timestamps=True, fp16=on_gpu)
+    return res
+
+_SEGMENT_KEYS = ('id', 'start', 'end', 'text')
+_WORD_KEYS = ('word', 'start', 'end')
+
+def _slim_transcription(res):
+    """
+    Copy of a Whisper result with only what captioning and review read (text/start/end per segment
+    and word, plus language). Tokens, logprobs and word probabilities are dropped from saved JSON.
+    """
+    return {
+        'text': res.get('text', ''),
+        'segments': [
+            dict({k: seg[k] for k in _SEGMENT_KEYS if k in seg},
+                 words=[{k: w[k] for k in _WORD_KEYS if k in w} for w in seg.get('words') or ()])
+            for seg in res.get('segments', [])
+        ],
+        'language': res.get('language')
+    }
+
+def _video_fingerprint(path):
+    """BLAKE2b of the file size plus its first and last MiB (cheap content key, no full read)."""
+    size = os.path.getsize(path)
+    h = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, "rb") as f:
+        h.update(f.read(FINGERPRINT_CHUNK))
+        if size > FINGERPRINT_CHUNK:
+            f.seek(max(FINGERPRINT_CHUNK, size - FINGERPRINT_CHUNK))
+            h.update(f.read(FINGERPRINT_CHUNK))
+    return h.hexdigest()
+
+def _load_cached_transcription(cache_path):
+    try:
+        return read_json(cache_path)
+    except Exception:
+        return None
+
+def _store_cached_transcription(cache_path, res):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        write_json(tmp_path, res)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        print(f"[WARN] Could not write transcription cache ({e})")
+
+def transcribe_video(video_path, temp_dir, model_size="medium"):
+    cache_path = None
+    try:
+        # the backend is part of the key: faster-whisper and openai-whisper word timings differ
+        backend = "fw" if HAVE_FASTER_WHISPER else "ow"
+        cache_path = os.path.join(CACHE_DIR, f"{_video_fingerprint(video_path)}-{backend}-{model_size}.json")
+    except OSError:
+        pass
+    res = _load_cached_transcription(cache_path) if cache_path else None
+    if res is not None:
+        print(f"[INFO] Reusing cached transcription for {video_path} (model='{model_size}').")
+        slim = res
+    else:
+        res = _run_whisper(video_path, model_size)
+        # the full result stays in memory; only the fields anything reads back are persisted
+        slim = _slim_transcription(res)
+        if cache_path:
+            _store_cached_transcription(cache_path, slim)
+
     json_path = os.path.join(temp_dir, "transcription.json")
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(res, f, ensure_ascii=False, indent=2)
+    # machine-written: compact; review_transcription rewrites it indented if the user edits it
+    write_json(json_path, slim)
     print(f"[INFO] Transcription saved to: {json_path}")
     return json_path, res
 
@@ -23,8 +217,18 @@ def review_transcription(json_path, transcription):
     """Allow user to review and optionally edit segment-level text.
     NOTE: editing will not update per-word timestamps (if present)."""
     print("\n[REVIEW] Transcription segments (index: start - end : text)\n")
-    for i, seg in enumerate(transcription.get('segments', [])):
-        print(f"[{i}] {format_time_srt(seg.get('start',0))} - {format_time_srt(seg.get('end',0))}: {seg.get('text','').strip()}")
+    segments = transcription.get('segments', [])
+    seg_starts = format_times_srt_batch([seg.get('start', 0) for seg in segments])
+    seg_ends = format_times_srt_batch([seg.get('end', 0) for seg in segments])
+    listing = "\n".join(
+        f"[{i}] {seg_starts[i]} - {seg_ends[i]}: {seg.get('text','').strip()}"
+        for i, seg in enumerate(segments)
+    )
+    # One write; long listings go through the pager so only a screenful is rendered at a time
+    if len(segments) > shutil.get_terminal_size().lines - 2:
+        pydoc.pager(listing)
+    elif listing:
+        print(listing)
 
     edit = input('\nDo you want to edit any segment text? (y/n): ').strip().lower()
     if edit == 'y':
@@ -46,8 +250,7 @@ def review_transcription(json_path, transcription):
             except ValueError:
                 print("[ERROR] Please enter a number or 'done'.")
 
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(transcription, f, ensure_ascii=False, indent=2)
+        write_json(json_path, _slim_transcription(transcription), indent=True)
         print(f"[INFO] Updated transcription saved: {json_path}")
 
     return json_path, transcription
\ No newline at end of file